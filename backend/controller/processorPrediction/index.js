@@ -39,6 +39,18 @@ exports.fetchAll = async (req,res) => {
   }
 }
 
+exports.rescoreAllFireData = async (req, res) => {
+  try {
+    const predictions = await fireService.rescoreAllFireData();
+    res.status(200).json({
+      message: "Fire data rescored successfully",
+      data: predictions
+    });
+  } catch (error) {
+    res.status(500).json({ message: "Rescoring failed", error: error.message });
+  }
+};
+
 exports.handleFirePrediction = async (req, res) => {
   try {
     const userId = req.user?._id;
@@ -0,0 +1,68 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Collects concurrent requests for a short window and runs them as one batch.
+
+    `run_batch` receives a list of submitted items and must return a list of
+    results in the same order. Each caller blocks on its own future only.
+    The worker thread is restarted in forked children (e.g. gunicorn workers
+    forked from a preloading master), since threads do not survive fork().
+    """
+
+    def __init__(self, run_batch, max_batch_size=32, max_wait_ms=5, name="micro-batcher"):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self.name = name
+        self._start()
+        os.register_at_fork(after_in_child=self._start)
+
+    def _start(self):
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def __call__(self, item, timeout=None):
+        return self.submit(item).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            futures = [future for _, future in batch]
+            try:
+                results = self.run_batch(items)
+                if len(results) != len(items):
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results for {len(items)} inputs"
+                    )
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+            for future, result in zip(futures, results):
+                future.set_result(result)
@@ -0,0 +1,86 @@
+"""Pixel parity and speed of cam_render.generate_cam against the previous version.
+
+Uses random activation maps over the frontend images at --size, for both
+fire and no-fire predictions. Fails if any channel differs by more than
+--tolerance.
+
+    python benchmarks/bench_generate_cam.py --size 224 --repeat 200
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cam_render import generate_cam  # noqa: E402
+
+IMAGES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../../frontend/public/images"
+)
+
+
+def legacy_generate_cam(original_img, conv_output, pred_class, lut):
+    weights = np.mean(conv_output[0], axis=-1)
+    weights = np.maximum(weights, 0)
+    weights /= np.max(weights)
+
+    heatmap = lut[np.uint8(255 * weights)]
+    original_img_bgr = cv2.cvtColor(original_img, cv2.COLOR_RGB2BGR)
+    heatmap = cv2.resize(heatmap, (original_img_bgr.shape[1], original_img_bgr.shape[0]))
+    cam_img = cv2.addWeighted(original_img_bgr, 0.7, heatmap, 0.3, 0)
+
+    if pred_class == 1:
+        fire_mask = (weights > 0.5).astype(np.uint8)
+        fire_mask = cv2.resize(fire_mask, (original_img_bgr.shape[1], original_img_bgr.shape[0]))
+
+        enhanced_heatmap = cv2.addWeighted(original_img_bgr, 0.6, heatmap, 0.4, 0)
+        cam_img[fire_mask == 1] = enhanced_heatmap[fire_mask == 1]
+
+    return cam_img
+
+
+def time_per_call(fn, cases, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(*cases[i % len(cases)])
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark generate_cam")
+    parser.add_argument("--size", type=int, default=224, help="square image size in pixels")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--tolerance", type=int, default=0)
+    args = parser.parse_args()
+
+    lut = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cv2.COLORMAP_PLASMA).reshape(256, 3)
+    rng = np.random.default_rng(0)
+    cases = []
+    for path in sorted(glob.glob(os.path.join(IMAGES_DIR, "*.jpg")))[:8]:
+        image = cv2.cvtColor(cv2.resize(cv2.imread(path), (args.size, args.size)), cv2.COLOR_BGR2RGB)
+        conv_output = rng.standard_normal((1, 7, 7, 64)).astype(np.float32)
+        for pred_class in (0, 1):
+            cases.append((image, conv_output, pred_class, lut))
+
+    max_diff = 0
+    for case in cases:
+        expected = legacy_generate_cam(*case)
+        actual = generate_cam(*case)
+        max_diff = max(max_diff, int(np.abs(expected.astype(np.int16) - actual).max()))
+
+    legacy = time_per_call(legacy_generate_cam, cases, args.repeat)
+    current = time_per_call(generate_cam, cases, args.repeat)
+    print(f"{len(cases)} cases at {args.size}x{args.size}, max channel diff {max_diff}")
+    print(f"legacy  {legacy * 1e6:9.1f} us/call")
+    print(f"current {current * 1e6:9.1f} us/call  x{legacy / current:.2f}")
+    if max_diff > args.tolerance:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
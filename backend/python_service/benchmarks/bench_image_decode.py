@@ -0,0 +1,91 @@
+"""Decode + resize cost of preprocess_image on large images.
+
+Compares the previous PIL full decode -> resize -> float64 path with the
+JPEG draft (DCT scaling) + float32 path used by image_server.py. Without
+--corpus, large JPEG tiles are synthesised by upscaling the frontend images.
+
+    python benchmarks/bench_image_decode.py --size 6000x4000 --repeat 5
+    python benchmarks/bench_image_decode.py --corpus /data/satellite_tiles
+"""
+import argparse
+import glob
+import io
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+IMAGES_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../../frontend/public/images"
+)
+MODEL_INPUT_SIZE = (224, 224)
+INPUT_SHAPE = (224, 224, 3)
+JPEG_DRAFT_FACTOR = 2
+
+
+def legacy_preprocess(image_bytes):
+    img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
+    img = img.resize(MODEL_INPUT_SIZE)
+    img_array = np.array(img) / 255.0
+    return np.expand_dims(img_array, axis=0), np.array(img)
+
+
+def draft_preprocess(image_bytes, out):
+    # Mirrors image_server.preprocess_image without importing the model server.
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == 'JPEG':
+        img.draft('RGB', (MODEL_INPUT_SIZE[0] * JPEG_DRAFT_FACTOR, MODEL_INPUT_SIZE[1] * JPEG_DRAFT_FACTOR))
+    img = img.convert('RGB').resize(MODEL_INPUT_SIZE)
+    original_img = np.asarray(img)
+    np.divide(original_img, 255, out=out.reshape(INPUT_SHAPE), dtype=np.float32)
+    return out, original_img
+
+
+def load_corpus(corpus, size):
+    if corpus:
+        paths = sorted(glob.glob(os.path.join(corpus, "*.jp*g")))
+        return [open(path, "rb").read() for path in paths]
+
+    images = []
+    for path in sorted(glob.glob(os.path.join(IMAGES_DIR, "*.jpg")))[:8]:
+        img = Image.open(path).convert('RGB').resize(size)
+        buffer = io.BytesIO()
+        img.save(buffer, format="JPEG", quality=90)
+        images.append(buffer.getvalue())
+    return images
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark preprocess_image decode paths")
+    parser.add_argument("--corpus", help="directory of JPEG images (default: synthesised tiles)")
+    parser.add_argument("--size", default="6000x4000", help="synthetic tile size WxH")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+    corpus = load_corpus(args.corpus, size)
+    out = np.empty((1,) + INPUT_SHAPE, dtype=np.float32)
+
+    timings = {"legacy": 0.0, "draft": 0.0}
+    max_diff = 0.0
+    for image_bytes in corpus:
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            legacy_tensor, _ = legacy_preprocess(image_bytes)
+            timings["legacy"] += time.perf_counter() - start
+
+            start = time.perf_counter()
+            draft_tensor, _ = draft_preprocess(image_bytes, out)
+            timings["draft"] += time.perf_counter() - start
+        max_diff = max(max_diff, float(np.abs(legacy_tensor - draft_tensor).max()))
+
+    calls = len(corpus) * args.repeat
+    print(f"{len(corpus)} images, {calls} decodes per path")
+    for label, total in timings.items():
+        print(f"{label:8s} {total / calls * 1000:8.2f} ms/image")
+    print(f"speedup  x{timings['legacy'] / timings['draft']:.1f}, max |input diff| {max_diff:.3f}")
+
+
+if __name__ == "__main__":
+    main()
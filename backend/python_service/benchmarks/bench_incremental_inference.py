@@ -0,0 +1,101 @@
+"""Parity and speed of incremental (sliding-window) inference on track replays.
+
+Replays every location in fire_tracks.json day by day: day d's window is the
+first d+1 track rows, i.e. day d-1's window moved on by one row. Each window
+runs through the Keras model, a full IncrementalCNN pass and a slide from the
+previous day's activations. Fails if a slide differs from the full pass by more
+than --tolerance, or from Keras by more than --atol.
+
+    python benchmarks/bench_incremental_inference.py
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental_cnn import IncrementalCNN  # noqa: E402
+from timestep_features import FEATURE_COLUMNS, fill_sequence  # noqa: E402
+from timestep_models import load_timestep_models  # noqa: E402
+
+TRACKS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../script/fire_tracks.json"
+)
+# fire_tracks.json field -> model feature; the rest stay 0.
+TRACK_FEATURES = {
+    "temp": "tmax", "rh": "rh", "wind": "ws", "vpd": "vpd", "day_frac": "day_frac",
+    "firearea": "firearea", "prevgrow": "prevGrowth", "pctgrowth": "pctgrowth_capped",
+}
+
+
+def track_entries(rows):
+    entries = []
+    for row in rows:
+        entry = dict.fromkeys(FEATURE_COLUMNS, 0.0)
+        entry.update({feature: float(row[field]) for field, feature in TRACK_FEATURES.items()})
+        entries.append(entry)
+    return entries
+
+
+def load_replays(max_locations):
+    with open(TRACKS_FILE) as f:
+        tracks = json.load(f)
+    replays = []
+    for rows in list(tracks.values())[:max_locations]:
+        entries = track_entries(rows)
+        replays.append(np.stack([fill_sequence(entries[:day + 1]) for day in range(len(entries))]))
+    return replays
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark incremental sliding-window inference")
+    parser.add_argument("--locations", type=int, default=1000)
+    parser.add_argument("--tolerance", type=float, default=0.0)
+    parser.add_argument("--atol", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    replays = load_replays(args.locations)
+    slides = sum(len(windows) - 1 for windows in replays)
+    print(f"{len(replays)} locations, {slides} day-to-day slides")
+
+    failed = False
+    for name, model in load_timestep_models("keras").items():
+        engine = IncrementalCNN(model.model)
+        timings = {"keras": 0.0, "full": 0.0, "sliding": 0.0}
+        slide_diff = keras_diff = 0.0
+        for windows in replays:
+            _, previous = engine.forward(windows[:1])
+            for day in range(1, len(windows)):
+                window = windows[day:day + 1]
+
+                start = time.perf_counter()
+                expected = model.predict(window)
+                timings["keras"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                full, _ = engine.forward(window)
+                timings["full"] += time.perf_counter() - start
+
+                start = time.perf_counter()
+                sliding, previous = engine.forward(window, previous)
+                timings["sliding"] += time.perf_counter() - start
+
+                slide_diff = max(slide_diff, float(np.abs(sliding - full).max()))
+                keras_diff = max(keras_diff, float(np.abs(sliding - expected).max()))
+
+        reused = [step for step in engine.slide_plan(1) if step is not None]
+        print(f"\n{name}: {len(reused)}/{len(engine.sequence_ops)} sequence layers reuse activations")
+        print(f"  max |sliding - full| {slide_diff:.3g}, max |sliding - keras| {keras_diff:.3g}")
+        for label, total in timings.items():
+            print(f"  {label:8s} {total / max(slides, 1) * 1e6:9.1f} us/window")
+        failed |= slide_diff > args.tolerance or keras_diff > args.atol
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Parity and cost of padding-prefix reuse on the stored FireData records.
+
+Every sequence in fire_data_records.json is left-padded to 143 rows. Each one
+runs through the Keras model, a full IncrementalCNN pass and a pass that
+reuses the precomputed all-padding activations. Fails unless the reuse pass is
+bit-identical to the full pass (and within --atol of Keras). Also reports the
+convolution multiply-adds each pass computes.
+
+    python benchmarks/bench_padding_prefix.py --repeat 20
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from incremental_cnn import Conv1DOp, IncrementalCNN  # noqa: E402
+from timestep_features import FEATURE_COLUMNS, fill_sequence  # noqa: E402
+from timestep_models import load_timestep_models  # noqa: E402
+
+RECORDS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../script/fire_data_records.json"
+)
+
+
+def conv_macs(engine, reused_positions):
+    total = 0
+    for op, shape, reused in zip(engine.sequence_ops, engine.activation_shapes, reused_positions):
+        if isinstance(op, Conv1DOp):
+            total += (shape[0] - reused) * op.kernel.size
+    return total
+
+
+def time_per_window(fn, windows, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for window in windows:
+            fn(window)
+    return (time.perf_counter() - start) / (repeat * len(windows))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark padding-prefix activation reuse")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--atol", type=float, default=1e-5)
+    args = parser.parse_args()
+
+    with open(RECORDS_FILE) as f:
+        records = json.load(f)
+    windows = [fill_sequence(entries)[np.newaxis] for entries in records.values()]
+    lengths = sorted(len(entries) for entries in records.values())
+    print(f"{len(windows)} sequences, {lengths[0]}-{lengths[-1]} real rows (median {lengths[len(lengths) // 2]})")
+
+    failed = False
+    for name, model in load_timestep_models("keras").items():
+        full_engine = IncrementalCNN(model.model)
+        engine = IncrementalCNN(model.model)
+        engine.set_padding_row(np.zeros(len(FEATURE_COLUMNS), dtype=np.float32))
+
+        reuse_diff = keras_diff = 0.0
+        macs = reused_macs = 0
+        for window in windows:
+            full = full_engine.predict(window)
+            reused = engine.predict(window)
+            reuse_diff = max(reuse_diff, float(np.abs(reused - full).max()))
+            keras_diff = max(keras_diff, float(np.abs(reused - model.predict(window)).max()))
+            macs += conv_macs(engine, [0] * len(engine.sequence_ops))
+            reused_macs += conv_macs(engine, engine.prefix_plan(engine.leading_padding_rows(window)))
+
+        timings = {
+            "keras": time_per_window(model.predict, windows, args.repeat),
+            "full": time_per_window(full_engine.predict, windows, args.repeat),
+            "prefix": time_per_window(engine.predict, windows, args.repeat),
+        }
+        print(f"\n{name}: max |prefix - full| {reuse_diff:.3g}, max |prefix - keras| {keras_diff:.3g}")
+        print(f"  conv multiply-adds per window {macs / len(windows):,.0f} -> {reused_macs / len(windows):,.0f}"
+              f" (x{macs / max(reused_macs, 1):.1f} fewer)")
+        for label, seconds in timings.items():
+            print(f"  {label:8s} {seconds * 1e6:9.1f} us/window")
+        failed |= reuse_diff != 0 or keras_diff > args.atol
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
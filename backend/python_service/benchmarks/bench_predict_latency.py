@@ -0,0 +1,58 @@
+"""Single-sample latency of Model.predict versus CompiledModel direct calls.
+
+Covers the three timestep models and, when present, the satellite gate and
+CAM models used by image_server.py. Run from backend/python_service:
+
+    python benchmarks/bench_predict_latency.py --repeat 200 [--jit]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compiled_model import CompiledModel  # noqa: E402
+from timestep_models import MODEL_DIR, TIMESTEP_MODEL_FILES, load_keras_model  # noqa: E402
+
+IMAGE_MODEL_FILES = {
+    "satellite": os.path.join(MODEL_DIR, "satellite_classifier.h5"),
+    "cam": os.path.join(MODEL_DIR, "wildfirewatch_cam_model.h5"),
+}
+
+
+def percentiles(fn, sample, repeat):
+    fn(sample)
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(sample)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[int(len(latencies) * 0.99)] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare Model.predict and CompiledModel latency")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--jit", action="store_true", help="XLA-compile the traced functions")
+    args = parser.parse_args()
+
+    model_files = dict(TIMESTEP_MODEL_FILES)
+    model_files.update({name: path for name, path in IMAGE_MODEL_FILES.items() if os.path.exists(path)})
+
+    print(f"{'model':15s} {'predict p50':>12s} {'p99':>8s} {'direct p50':>12s} {'p99':>8s}  (ms)")
+    for name, model_file in model_files.items():
+        model = load_keras_model(model_file)
+        compiled = CompiledModel(model, jit_compile=args.jit)
+        sample = np.random.rand(1, *model.input_shape[1:]).astype(np.float32)
+
+        predict_p50, predict_p99 = percentiles(lambda x: model.predict(x, verbose=0), sample, args.repeat)
+        direct_p50, direct_p99 = percentiles(compiled.predict, sample, args.repeat)
+        print(f"{name:15s} {predict_p50:12.2f} {predict_p99:8.2f} {direct_p50:12.2f} {direct_p99:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
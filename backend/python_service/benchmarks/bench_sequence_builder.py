@@ -0,0 +1,87 @@
+"""Per-request CPU cost of turning /predict JSON into the model input tensor.
+
+Compares the previous dict -> DataFrame -> concat -> MinMaxScaler path with
+fill_sequence() plus the in-place float32 FeatureScaling used by model_api.py.
+Both are fitted on fire_data_records.json. Run from backend/python_service:
+
+    python benchmarks/bench_sequence_builder.py --repeat 2000
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.preprocessing import MinMaxScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from timestep_features import FEATURE_COLUMNS, REQUIRED_TIMESTEPS, FeatureScaling, fill_sequence  # noqa: E402
+
+RECORDS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../script/fire_data_records.json"
+)
+
+with open(RECORDS_FILE) as f:
+    records = json.load(f)
+training_rows = np.array([[entry[name] for name in FEATURE_COLUMNS] for entries in records.values() for entry in entries])
+scaler = MinMaxScaler(feature_range=(0, 1)).fit(training_rows)
+feature_scaling = FeatureScaling.fit(training_rows)
+
+
+def legacy_build(entries):
+    processed_data_points = []
+    for entry in entries:
+        processed_data_points.append({name: entry[name] for name in FEATURE_COLUMNS})
+    input_df = pd.DataFrame(processed_data_points, columns=FEATURE_COLUMNS)
+
+    current_timesteps = len(input_df)
+    if current_timesteps < REQUIRED_TIMESTEPS:
+        padding_df = pd.DataFrame(0, index=range(REQUIRED_TIMESTEPS - current_timesteps), columns=FEATURE_COLUMNS)
+        sequence_df = pd.concat([padding_df, input_df], ignore_index=True)
+    elif current_timesteps > REQUIRED_TIMESTEPS:
+        sequence_df = input_df.tail(REQUIRED_TIMESTEPS)
+    else:
+        sequence_df = input_df
+    return scaler.transform(sequence_df.values).reshape(REQUIRED_TIMESTEPS, len(FEATURE_COLUMNS))
+
+
+def vectorized_build(entries, out=None):
+    return feature_scaling.transform(fill_sequence(entries, out))
+
+
+def time_per_call(fn, sequences, repeat):
+    start = time.process_time()
+    for i in range(repeat):
+        fn(sequences[i % len(sequences)])
+    return (time.process_time() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    sequences = list(records.values())
+
+    for entries in sequences:
+        np.testing.assert_allclose(legacy_build(entries), vectorized_build(entries), rtol=1e-6, atol=1e-4)
+
+    buffer = np.empty((REQUIRED_TIMESTEPS, len(FEATURE_COLUMNS)), dtype=np.float32)
+    results = [
+        ("pandas + MinMaxScaler", time_per_call(legacy_build, sequences, args.repeat)),
+        ("fill_sequence (new array)", time_per_call(vectorized_build, sequences, args.repeat)),
+        ("fill_sequence (reused buffer)",
+         time_per_call(lambda entries: vectorized_build(entries, buffer), sequences, args.repeat)),
+    ]
+
+    baseline = results[0][1]
+    print(f"{len(sequences)} sequences, {args.repeat} calls each path (CPU time)")
+    for label, seconds in results:
+        print(f"{label:32s} {seconds * 1e6:9.1f} us/request  x{baseline / seconds:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
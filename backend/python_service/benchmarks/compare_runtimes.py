@@ -0,0 +1,96 @@
+"""Parity, latency and RSS comparison between the keras and tflite runtimes.
+
+Each runtime is loaded in its own subprocess so import time and peak RSS are
+measured in isolation. Predictions for the sequences in
+fire_data_records.json must agree within --atol. Run after export_models.py:
+
+    python benchmarks/compare_runtimes.py --repeat 200
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+RECORDS_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "../../script/fire_data_records.json"
+)
+
+
+def run_child(runtime, repeat):
+    start = time.perf_counter()
+    import numpy as np
+    from timestep_features import fill_sequence
+    from timestep_models import load_timestep_models
+    models = load_timestep_models(runtime)
+    load_seconds = time.perf_counter() - start
+
+    with open(RECORDS_FILE) as f:
+        records = json.load(f)
+    keys = list(records.keys())
+    batch = np.stack([fill_sequence(records[key]) for key in keys])
+
+    outputs = {name: model.predict(batch).tolist() for name, model in models.items()}
+
+    latencies = []
+    single = batch[:1]
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for model in models.values():
+            model.predict(single)
+        latencies.append(time.perf_counter() - t0)
+    latencies.sort()
+
+    print(json.dumps({
+        "runtime": runtime,
+        "load_seconds": load_seconds,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "outputs": outputs,
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare keras and tflite timestep runtimes")
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--atol", type=float, default=1e-4)
+    parser.add_argument("--child", choices=["keras", "tflite"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.repeat)
+        return
+
+    results = {}
+    for runtime in ("keras", "tflite"):
+        completed = subprocess.run(
+            [sys.executable, __file__, "--child", runtime, "--repeat", str(args.repeat)],
+            check=True, capture_output=True, text=True,
+        )
+        results[runtime] = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    import numpy as np
+    mismatched = False
+    for name, expected in results["keras"]["outputs"].items():
+        actual = results["tflite"]["outputs"][name]
+        max_diff = float(np.max(np.abs(np.asarray(expected) - np.asarray(actual))))
+        status = "OK" if max_diff <= args.atol else "MISMATCH"
+        mismatched = mismatched or max_diff > args.atol
+        print(f"parity {name:15s} max |diff| = {max_diff:.2e}  {status}")
+
+    print(f"{'runtime':8s} {'load s':>8s} {'p50 ms':>8s} {'p99 ms':>8s} {'RSS MB':>8s}")
+    for runtime, result in results.items():
+        print(f"{runtime:8s} {result['load_seconds']:8.2f} {result['p50_ms']:8.2f} "
+              f"{result['p99_ms']:8.2f} {result['max_rss_mb']:8.1f}")
+
+    if mismatched:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import threading
+
+import cv2
+import numpy as np
+
+_buffers = threading.local()
+
+
+def frame_buffers(height, width):
+    # Per-thread BGR and output frames, reallocated only when the size changes.
+    buffers = getattr(_buffers, "frames", None)
+    if buffers is None or buffers[0].shape[:2] != (height, width):
+        buffers = _buffers.frames = (
+            np.empty((height, width, 3), dtype=np.uint8),
+            np.empty((height, width, 3), dtype=np.uint8),
+        )
+    return buffers
+
+
+def fit_to_size(image, max_size):
+    # Downscale so the longest side is at most max_size; never upscales.
+    height, width = image.shape[:2]
+    if not max_size or max(height, width) <= max_size:
+        return image
+    scale = max_size / max(height, width)
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+def generate_cam(original_img, conv_output, pred_class, lut, max_size=None):
+    """Blend the class activation heatmap over an RGB image and return BGR.
+
+    The overlay is rendered at the image's own resolution, downscaled first
+    when its longest side exceeds `max_size`; the 7x7 heatmap is upsampled
+    once, straight to that size.
+
+    For fire predictions the region where the activation exceeds 0.5 gets a
+    stronger heatmap weight. That second blend only covers the mask's bounding
+    box and is copied through the mask once, instead of blending the full frame
+    and boolean-indexing it twice. The returned frame is a per-thread buffer,
+    so encode or copy it before the next call.
+    """
+    weights = np.mean(conv_output[0], axis=-1)
+    np.maximum(weights, 0, out=weights)
+    peak = weights.max()
+    if peak > 0:
+        weights /= peak
+
+    original_img = fit_to_size(original_img, max_size)
+    height, width = original_img.shape[:2]
+    heatmap = cv2.resize(lut[np.uint8(255 * weights)], (width, height))
+    original_img_bgr, cam_img = frame_buffers(height, width)
+    cv2.cvtColor(original_img, cv2.COLOR_RGB2BGR, dst=original_img_bgr)
+
+    cv2.addWeighted(original_img_bgr, 0.7, heatmap, 0.3, 0, dst=cam_img)
+
+    if pred_class == 1:
+        fire_mask = cv2.resize((weights > 0.5).astype(np.uint8), (width, height))
+        x, y, w, h = cv2.boundingRect(fire_mask)
+        if w and h:
+            roi = (slice(y, y + h), slice(x, x + w))
+            enhanced_heatmap = cv2.addWeighted(original_img_bgr[roi], 0.6, heatmap[roi], 0.4, 0)
+            cv2.copyTo(enhanced_heatmap, fire_mask[roi], cam_img[roi])
+
+    return cam_img
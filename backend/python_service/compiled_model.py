@@ -0,0 +1,42 @@
+import os
+
+import numpy as np
+import tensorflow as tf
+
+# XLA-compile every traced model; off by default because the first call pays
+# the compilation cost and not every op is supported by XLA on CPU.
+INFERENCE_JIT = os.environ.get("INFERENCE_JIT", "0") == "1"
+
+
+class CompiledModel:
+    """Direct-call inference for a Keras model through one traced tf.function.
+
+    Model.predict builds a data adapter and iterator on every call, which
+    dominates latency for batches of one. This traces `model(x, training=False)`
+    once for a fixed (None, ...) signature and returns NumPy outputs with the
+    same structure predict() would (an array, or a list for multi-output models).
+    """
+
+    def __init__(self, model, jit_compile=None):
+        self.model = model
+        model_input = model.inputs[0]
+        self.dtype = tf.as_dtype(model_input.dtype)
+        spec = tf.TensorSpec((None,) + tuple(model_input.shape[1:]), self.dtype)
+        self._function = tf.function(
+            lambda batch: model(batch, training=False),
+            input_signature=[spec],
+            jit_compile=INFERENCE_JIT if jit_compile is None else jit_compile,
+        )
+
+    @property
+    def input_shape(self):
+        return self.model.input_shape
+
+    def predict(self, batch):
+        outputs = self._function(np.asarray(batch, dtype=self.dtype.as_numpy_dtype))
+        if isinstance(outputs, (list, tuple)):
+            return [output.numpy() for output in outputs]
+        return outputs.numpy()
+
+    def __call__(self, batch):
+        return self.predict(batch)
@@ -0,0 +1,67 @@
+"""Export the timestep Keras models to TFLite for the lightweight CPU runtime.
+
+    python export_models.py            # writes <model>.tflite next to each .h5
+    python export_models.py --optimize # also applies default weight quantisation
+    python export_models.py --fused    # also exports the fused classifier+regressor graph
+
+Start model_api.py with MODEL_RUNTIME=tflite to serve the exported files.
+"""
+import argparse
+
+import tensorflow as tf
+
+from timestep_models import (
+    FUSED_PIPELINE_FILE,
+    TIMESTEP_MODEL_FILES,
+    build_fused_function,
+    load_keras_model,
+    tflite_path,
+)
+
+
+def write_tflite(converter, output_file, optimize=False):
+    if optimize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    tflite_model = converter.convert()
+    with open(output_file, "wb") as f:
+        f.write(tflite_model)
+    return len(tflite_model)
+
+
+def export_tflite(model_file, output_file, optimize=False):
+    model = load_keras_model(model_file)
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    return write_tflite(converter, output_file, optimize=optimize)
+
+
+def export_fused_tflite(output_file, optimize=False):
+    keras_models = {
+        name: load_keras_model(model_file) for name, model_file in TIMESTEP_MODEL_FILES.items()
+    }
+    fused_pipeline = build_fused_function(keras_models)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions(
+        [fused_pipeline.get_concrete_function()], fused_pipeline
+    )
+    return write_tflite(converter, output_file, optimize=optimize)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export timestep models to TFLite")
+    parser.add_argument("--optimize", action="store_true",
+                        help="apply tf.lite.Optimize.DEFAULT (smaller, may change outputs slightly)")
+    parser.add_argument("--fused", action="store_true",
+                        help="also export the single-graph pipeline used by FUSED_PIPELINE=1")
+    args = parser.parse_args()
+
+    for name, model_file in TIMESTEP_MODEL_FILES.items():
+        output_file = tflite_path(model_file)
+        size = export_tflite(model_file, output_file, optimize=args.optimize)
+        print(f"{name}: {output_file} ({size / 1024:.1f} KiB)")
+
+    if args.fused:
+        size = export_fused_tflite(FUSED_PIPELINE_FILE, optimize=args.optimize)
+        print(f"fused: {FUSED_PIPELINE_FILE} ({size / 1024:.1f} KiB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Fit the per-feature min/scale model_api.py normalises inputs with.
+
+    python fit_normalization.py train.csv                  # one column per feature
+    python fit_normalization.py fire_data_records.json     # {location: [timestep, ...]}
+    python fit_normalization.py train.csv --target prevGrowth
+
+Writes NORMALIZATION_FILE (timestep_normalization.json next to the models by
+default); model_api.py loads it at startup. Fit on the same rows the models
+were trained on, before padding.
+"""
+import argparse
+import csv
+import json
+
+import numpy as np
+
+from timestep_features import FEATURE_COLUMNS, FeatureScaling
+from timestep_models import NORMALIZATION_FILE
+
+
+def read_rows(path):
+    if path.endswith(".json"):
+        with open(path) as f:
+            records = json.load(f)
+        timesteps = [entry for entries in records.values() for entry in entries]
+    else:
+        with open(path, newline="") as f:
+            timesteps = list(csv.DictReader(f))
+    return np.array([[float(entry[name]) for name in FEATURE_COLUMNS] for entry in timesteps])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit timestep feature normalisation")
+    parser.add_argument("training_data", help="CSV with a column per feature, or timestep records JSON")
+    parser.add_argument("--target", default=FEATURE_COLUMNS[0], choices=FEATURE_COLUMNS,
+                        help="feature the regressors predict, in its normalised units")
+    parser.add_argument("--output", default=NORMALIZATION_FILE)
+    args = parser.parse_args()
+
+    rows = read_rows(args.training_data)
+    FeatureScaling.fit(rows, target=args.target).save(args.output)
+    print(f"{args.output}: fitted on {len(rows)} timesteps, target {args.target}")
+
+
+if __name__ == "__main__":
+    main()
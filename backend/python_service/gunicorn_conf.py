@@ -0,0 +1,104 @@
+"""Production serving for model_api.py and image_server.py.
+
+    gunicorn -c gunicorn_conf.py -b 0.0.0.0:5002 model_api:app
+    gunicorn -c gunicorn_conf.py -b 0.0.0.0:5003 image_server:app
+
+The app is imported once in the master (TensorFlow, OpenCV, the colormap
+tables, ...) and workers are forked from it, sharing those pages
+copy-on-write. Models that survive fork() (model_api's TFLite runtime) are
+loaded and warmed in the master too; TensorFlow models hang when used in a
+forked child, so each worker starts its own background loader right after the
+fork and answers 503 on /predict and /readyz until it is ready. The CPU is split
+between workers through INFERENCE_INTRA_OP_THREADS / INFERENCE_INTER_OP_THREADS
+unless they are set explicitly. Prometheus metrics are kept in
+PROMETHEUS_MULTIPROC_DIR (a fresh temporary directory by default) so /metrics
+on any worker reports the whole server.
+
+Every worker has its own memory, so in-process caches are per worker. With
+more than one worker, image_server's CAM store and result cache default to
+shared temporary directories (CAM_STORE_SPILL_DIR, RESULT_CACHE_DIR). Both
+write through and keep files after a read, so GET /cam/<file> works on
+whichever worker receives it and a cached result is a hit on every worker.
+Set the variables to keep them somewhere persistent. model_api's
+INCREMENTAL_INFERENCE activations are shared the same way through
+ACTIVATION_CACHE_DIR; otherwise the next day's window could only slide on
+the worker that computed today's, about 1/WEB_WORKERS of the time. model_api's
+prediction cache stays per worker.
+
+Temporary directories created here are deleted when the master exits, so
+they do not pile up in /tmp across restarts. Directories set through the
+environment are left alone and are reused by the next start.
+"""
+import glob
+import os
+import shutil
+import sys
+import tempfile
+
+workers = int(os.environ.get("WEB_WORKERS", 2))
+threads = int(os.environ.get("WEB_THREADS", 4))
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.environ.get("WEB_TIMEOUT", 120))
+graceful_timeout = int(os.environ.get("WEB_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("WEB_KEEPALIVE", 5))
+if os.environ.get("WEB_BIND"):
+    bind = os.environ["WEB_BIND"]
+
+os.environ.setdefault("INFERENCE_INTRA_OP_THREADS", str(max(1, (os.cpu_count() or 1) // workers)))
+os.environ.setdefault("INFERENCE_INTER_OP_THREADS", "1")
+os.environ["DEFER_MODEL_LOADING"] = "1"
+
+# Temporary directories created below, removed again when the master exits.
+# Listed in the environment because a HUP re-executes this file, and by then
+# the variables are set so nothing here would be recorded again.
+CREATED_DIRS_VARIABLE = "GUNICORN_CONF_CREATED_DIRS"
+
+
+def created_dirs():
+    return [path for path in os.environ.get(CREATED_DIRS_VARIABLE, "").split(os.pathsep) if path]
+
+
+def default_dir(variable, prefix):
+    if variable not in os.environ:
+        os.environ[variable] = tempfile.mkdtemp(prefix=prefix)
+        os.environ[CREATED_DIRS_VARIABLE] = os.pathsep.join(created_dirs() + [os.environ[variable]])
+
+
+if workers > 1:
+    default_dir("CAM_STORE_SPILL_DIR", "cam-store-")
+    default_dir("RESULT_CACHE_DIR", "result-cache-")
+    default_dir("ACTIVATION_CACHE_DIR", "activation-cache-")
+
+# Must be set before the app imports prometheus_client. Samples from a previous
+# run would be summed into this one's, so clear them.
+default_dir("PROMETHEUS_MULTIPROC_DIR", "prometheus-")
+for stale in glob.glob(os.path.join(os.environ["PROMETHEUS_MULTIPROC_DIR"], "*.db")):
+    os.remove(stale)
+
+
+def service_module(app):
+    # The module that defines the Flask app, e.g. model_api.
+    return sys.modules[app.wsgi().import_name]
+
+
+def when_ready(server):
+    module = service_module(server.app)
+    if module.MODELS_FORK_SAFE:
+        server.log.info("Loading models in the master")
+        module.model_loader.load()
+
+
+def post_worker_init(worker):
+    service_module(worker.app).model_loader.start()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
+
+
+def on_exit(server):
+    for directory in created_dirs():
+        shutil.rmtree(directory, ignore_errors=True)
@@ -0,0 +1,81 @@
+import contextlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+CHUNK_SIZE = 64 * 1024
+
+
+class ImageFetchError(Exception):
+    def __init__(self, message, status_code=502):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ImageFetcher:
+    """Downloads images over a shared keep-alive session.
+
+    The connection pool is bounded, every request has connect/read timeouts,
+    bodies larger than `max_bytes` are rejected while streaming, and a
+    download still running `total_timeout` seconds after it started is
+    abandoned with a 504, so an origin that trickles bytes in cannot hold a
+    thread for longer than that (plus at most one read timeout). `executor`
+    is a small thread pool for running several downloads at once. `timer`,
+    if given, is called for a context manager wrapped around every download
+    (e.g. a latency metric).
+    """
+
+    def __init__(self, pool_size=16, connect_timeout=3.05, read_timeout=10.0, total_timeout=30.0,
+                 max_bytes=25 * 1024 * 1024, retries=2, workers=8, timer=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.total_timeout = total_timeout
+        self.timer = timer or contextlib.nullcontext
+        self.max_bytes = max_bytes
+        self.session = requests.Session()
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.2,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=("GET",),
+        )
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image-fetch")
+
+    def fetch(self, url):
+        with self.timer():
+            return self._download(url, time.monotonic() + self.total_timeout)
+
+    def _download(self, url, deadline):
+        try:
+            with self.session.get(url, stream=True, timeout=self.timeout) as response:
+                response.raise_for_status()
+                content_length = response.headers.get("Content-Length")
+                if content_length and int(content_length) > self.max_bytes:
+                    raise ImageFetchError(f"Image exceeds {self.max_bytes} bytes", 413)
+
+                chunks = []
+                total = 0
+                # read1() returns after a single socket read, so the deadline
+                # is checked however slowly the body arrives; iter_content()
+                # would block until a whole chunk had been received.
+                while True:
+                    chunk = response.raw.read1(CHUNK_SIZE, decode_content=True)
+                    if not chunk:
+                        break
+                    if time.monotonic() > deadline:
+                        raise ImageFetchError(f"Timed out fetching image from {url}", 504)
+                    total += len(chunk)
+                    if total > self.max_bytes:
+                        raise ImageFetchError(f"Image exceeds {self.max_bytes} bytes", 413)
+                    chunks.append(chunk)
+                return b"".join(chunks)
+        except (requests.Timeout, urllib3.exceptions.TimeoutError):
+            raise ImageFetchError(f"Timed out fetching image from {url}", 504)
+        except (requests.RequestException, urllib3.exceptions.HTTPError) as e:
+            raise ImageFetchError(f"Failed to fetch image: {e}", 502)
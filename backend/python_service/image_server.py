@@ -1,48 +1,222 @@
-from flask import Flask, request, jsonify, send_file
+from flask import Flask, Request, Response, request, jsonify, make_response
 import tensorflow as tf
 import numpy as np
-import requests
 import cv2
 from PIL import Image
+from werkzeug.exceptions import RequestEntityTooLarge
+import base64
+import hashlib
 import io
+import json
+import logging
+import math
 import os
-import uuid
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from cam_render import fit_to_size, generate_cam
+from compiled_model import CompiledModel
+from image_fetch import ImageFetcher, ImageFetchError
+from inference_threads import configure_tensorflow_threads
+from model_loader import ModelLoader
+from result_store import ResultStore
+from service_logging import configure_logging, log_payload, register_request_logging
+from service_metrics import ServiceMetrics
+
+configure_logging()
+logger = logging.getLogger("image_server")
+metrics = ServiceMetrics("image_server")
 
 app = Flask(__name__)
+register_request_logging(app, logger)
+metrics.register(app)
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "../wildfireModel")
+MODEL_DIR = os.environ.get("WILDFIRE_MODEL_DIR", os.path.join(BASE_DIR, "../wildfireModel"))
 CAM_MODEL_FILE = "wildfirewatch_cam_model.h5"
 SATELLITE_MODEL_FILE = "satellite_classifier.h5"
 PORT = 5003
-COLORMAP = cv2.COLORMAP_PLASMA
+DEFAULT_COLORMAP = "PLASMA"
+COLOR_SCALE_MAX_AGE = 24 * 60 * 60
+CAM_STORE_MAX_ITEMS = int(os.environ.get("CAM_STORE_MAX_ITEMS", 256))
+CAM_STORE_MAX_BYTES = int(os.environ.get("CAM_STORE_MAX_BYTES", 64 * 1024 * 1024))
+CAM_STORE_TTL_SECONDS = float(os.environ.get("CAM_STORE_TTL_SECONDS", 3600))
+CAM_STORE_SPILL_DIR = os.environ.get("CAM_STORE_SPILL_DIR")
+RESULT_CACHE_MAX_ITEMS = int(os.environ.get("RESULT_CACHE_MAX_ITEMS", 1024))
+RESULT_CACHE_MAX_BYTES = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 128 * 1024 * 1024))
+RESULT_CACHE_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR")
+RESULT_CACHE_DIR_MAX_ITEMS = int(os.environ.get("RESULT_CACHE_DIR_MAX_ITEMS", 16384))
+# Bump when the overlay rendering changes so cached CAMs are not reused.
+CAM_RENDER_VERSION = 2
+IMAGE_FETCH_POOL_SIZE = int(os.environ.get("IMAGE_FETCH_POOL_SIZE", 16))
+IMAGE_FETCH_WORKERS = int(os.environ.get("IMAGE_FETCH_WORKERS", 8))
+IMAGE_FETCH_CONNECT_TIMEOUT = float(os.environ.get("IMAGE_FETCH_CONNECT_TIMEOUT", 3.05))
+IMAGE_FETCH_READ_TIMEOUT = float(os.environ.get("IMAGE_FETCH_READ_TIMEOUT", 10))
+IMAGE_FETCH_TOTAL_TIMEOUT = float(os.environ.get("IMAGE_FETCH_TOTAL_TIMEOUT", 30))
+IMAGE_FETCH_MAX_BYTES = int(os.environ.get("IMAGE_FETCH_MAX_BYTES", 25 * 1024 * 1024))
+# "url" stores the overlay and returns /cam/<file>; "base64" returns it inline.
+CAM_FORMATS = ("url", "base64")
+
+QUALITY_THRESHOLD = 0.8
+MODEL_INPUT_SIZE = (224, 224)
+INPUT_SHAPE = (MODEL_INPUT_SIZE[1], MODEL_INPUT_SIZE[0], 3)
+JPEG_DRAFT_FACTOR = 2
+# Upper bound on the longest side of CAM overlays rendered at source resolution.
+CAM_MAX_OUTPUT_SIZE = int(os.environ.get("CAM_MAX_OUTPUT_SIZE", 4096))
+IMAGE_BATCH_MAX_IMAGES = int(os.environ.get("IMAGE_BATCH_MAX_IMAGES", 512))
+IMAGE_BATCH_MAX_SIZE = int(os.environ.get("IMAGE_BATCH_MAX_SIZE", 32))
+IMAGE_BATCH_MAX_UPLOAD_BYTES = int(os.environ.get("IMAGE_BATCH_MAX_UPLOAD_BYTES", 512 * 1024 * 1024))
+# One image plus room for multipart headers and form fields.
+IMAGE_UPLOAD_MAX_BYTES = IMAGE_FETCH_MAX_BYTES + 64 * 1024
+IMAGE_DECODE_WORKERS = int(os.environ.get("IMAGE_DECODE_WORKERS", os.cpu_count() or 4))
+
+class ImageServerRequest(Request):
+    # Bodies are capped at one image, except /predict_batch which may carry
+    # many. Per-image sizes are checked in the handlers.
+    @property
+    def max_content_length(self):
+        if self.endpoint == 'predict_batch':
+            return IMAGE_BATCH_MAX_UPLOAD_BYTES
+        return IMAGE_UPLOAD_MAX_BYTES
+
+app.request_class = ImageServerRequest
+app.config['MAX_CONTENT_LENGTH'] = IMAGE_UPLOAD_MAX_BYTES
 
 CAM_MODEL_PATH = os.path.join(MODEL_DIR, CAM_MODEL_FILE)
 SATELLITE_MODEL_PATH = os.path.join(MODEL_DIR, SATELLITE_MODEL_FILE)
 
-if not os.path.exists(CAM_MODEL_PATH):
-    raise FileNotFoundError(f"CAM model not found at {CAM_MODEL_PATH}")
-if not os.path.exists(SATELLITE_MODEL_PATH):
-    raise FileNotFoundError(f"Satellite model not found at {SATELLITE_MODEL_PATH}")
+# TensorFlow models loaded before fork() hang in the children, so under
+# gunicorn_conf.py each worker loads its own copy.
+MODELS_FORK_SAFE = False
+
+cam_model = satellite_model = None
+# Cached results are only valid for the exact model weights that produced
+# them. Hashed by the loader, so a missing or unreadable file shows up on
+# /healthz rather than failing the import.
+MODEL_VERSION = None
+
+def warm_up_models(models):
+    global cam_model, satellite_model, MODEL_VERSION
+    # The first call traces each graph, so pay it before reporting ready.
+    dummy_batch = np.zeros((1,) + INPUT_SHAPE, dtype=np.float32)
+    for model in models.values():
+        model.predict(dummy_batch)
+    MODEL_VERSION = file_digest(SATELLITE_MODEL_PATH, CAM_MODEL_PATH)[:16]
+    satellite_model = models["satellite"]
+    cam_model = models["cam"]
+
+model_loader = ModelLoader(
+    {
+        "satellite": lambda: CompiledModel(tf.keras.models.load_model(SATELLITE_MODEL_PATH)),
+        "cam": lambda: CompiledModel(tf.keras.models.load_model(CAM_MODEL_PATH)),
+    },
+    warmup=warm_up_models,
+    setup=configure_tensorflow_threads,
+)
+model_loader.register_health_routes(app)
+
+def file_digest(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+cam_store = ResultStore(
+    max_items=CAM_STORE_MAX_ITEMS,
+    max_bytes=CAM_STORE_MAX_BYTES,
+    ttl_seconds=CAM_STORE_TTL_SECONDS,
+    spill_dir=CAM_STORE_SPILL_DIR,
+    # On disk as soon as it is stored and kept after reads, so any process
+    # sharing the directory (gunicorn workers) can serve /cam/<file>.
+    write_through=True,
+)
+
+# Predictions keyed by image content, so resubmitted images skip the gate,
+# CAM inference and overlay. Set RESULT_CACHE_MAX_ITEMS=0 to disable.
+result_cache = ResultStore(
+    max_items=RESULT_CACHE_MAX_ITEMS,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=RESULT_CACHE_TTL_SECONDS,
+    spill_dir=RESULT_CACHE_DIR,
+    spill_max_items=RESULT_CACHE_DIR_MAX_ITEMS,
+    write_through=True,
+) if RESULT_CACHE_MAX_ITEMS > 0 else None
+
+image_fetcher = ImageFetcher(
+    pool_size=IMAGE_FETCH_POOL_SIZE,
+    connect_timeout=IMAGE_FETCH_CONNECT_TIMEOUT,
+    read_timeout=IMAGE_FETCH_READ_TIMEOUT,
+    total_timeout=IMAGE_FETCH_TOTAL_TIMEOUT,
+    max_bytes=IMAGE_FETCH_MAX_BYTES,
+    workers=IMAGE_FETCH_WORKERS,
+    timer=lambda: metrics.stage("download"),
+)
+
+_input_buffers = threading.local()
+decode_executor = ThreadPoolExecutor(max_workers=IMAGE_DECODE_WORKERS, thread_name_prefix="image-decode")
+
+def input_buffer():
+    # One (1, 224, 224, 3) float32 input per worker thread, reused across requests.
+    buffer = getattr(_input_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _input_buffers.buffer = np.empty((1,) + INPUT_SHAPE, dtype=np.float32)
+    return buffer
 
-cam_model = tf.keras.models.load_model(CAM_MODEL_PATH)
-satellite_model = tf.keras.models.load_model(SATELLITE_MODEL_PATH)
+def decode_rgb(image_bytes, draft_size):
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == 'JPEG':
+        # Let libjpeg decode at 1/2, 1/4 or 1/8 scale (DCT scaling) while staying
+        # at least draft_size, so large tiles skip most of the full-resolution
+        # decode. No-op for small images.
+        img.draft('RGB', draft_size)
+    return img.convert('RGB')
 
-def preprocess_image(image_bytes):
-    img = Image.open(io.BytesIO(image_bytes)).convert('RGB')
-    img = img.resize((224, 224))
-    img_array = np.array(img) / 255.0
-    return np.expand_dims(img_array, axis=0), np.array(img)
+@metrics.stage("decode")
+def preprocess_image(image_bytes, out=None, max_size=None):
+    """Decode into the model input tensor and the image the CAM is drawn on.
 
-def generate_color_scale():
+    The model input is always decoded at the same draft scale, so scores do not
+    depend on `max_size`. Without `max_size` the CAM image is the 224x224 model
+    input. With it, the CAM image has at least `max_size` on its longest side
+    when the source allows; that decode is reused when it is large enough and
+    otherwise the bytes are decoded a second time at a larger draft scale.
+    """
+    source = Image.open(io.BytesIO(image_bytes))
+    draft_size = (MODEL_INPUT_SIZE[0] * JPEG_DRAFT_FACTOR, MODEL_INPUT_SIZE[1] * JPEG_DRAFT_FACTOR)
+    img = decode_rgb(image_bytes, draft_size)
+    resized_img = np.asarray(img.resize(MODEL_INPUT_SIZE))
+
+    if out is None:
+        out = np.empty((1,) + INPUT_SHAPE, dtype=np.float32)
+    np.divide(resized_img, 255, out=out.reshape(INPUT_SHAPE), dtype=np.float32)
+    if not max_size:
+        return out, resized_img
+
+    # Enough pixels for the overlay's longest side to reach max_size.
+    scale = max_size / max(source.size)
+    overlay_size = (
+        max(draft_size[0], math.ceil(source.size[0] * scale)),
+        max(draft_size[1], math.ceil(source.size[1] * scale)),
+    )
+    if img.size != source.size and (img.size[0] < overlay_size[0] or img.size[1] < overlay_size[1]):
+        img = decode_rgb(image_bytes, overlay_size)
+    return out, np.asarray(img)
+
+def build_colormap_lut(colormap):
+    return cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), colormap).reshape(256, 3)
+
+def generate_color_scale(lut):
     height = 400
     width = 120
     scale = np.zeros((height, width, 3), dtype=np.uint8)
 
-    for i in range(height):
-        color_value = 255 - int(i / height * 255)
-        color = cv2.applyColorMap(np.uint8([color_value]), COLORMAP)[0][0]
-        scale[i, :80] = color
+    # One LUT lookup over the whole gradient instead of one call per row.
+    color_values = (255 - np.floor(np.arange(height) / height * 255)).astype(np.uint8)
+    scale[:, :80] = lut[color_values][:, np.newaxis]
 
     font = cv2.FONT_HERSHEY_SIMPLEX
     font_scale = 0.5
@@ -62,96 +236,391 @@ def generate_color_scale():
         cv2.line(scale, (75, y_pos), (85, y_pos), (255, 255, 255), 1)
         cv2.putText(scale, segment["range"], (90, y_pos + 5), font, font_scale, text_color, font_thickness, cv2.LINE_AA)
 
-    scale_path = os.path.join(BASE_DIR, "color_scale.png")
-    cv2.imwrite(scale_path, scale)
-    return scale_path
+    return scale
+
+@metrics.stage("color_scale")
+def encode_color_scale(lut):
+    ok, encoded = cv2.imencode(".png", generate_color_scale(lut))
+    if not ok:
+        raise RuntimeError("Failed to encode color scale")
+    png_bytes = encoded.tobytes()
+    return png_bytes, hashlib.sha1(png_bytes).hexdigest()
+
+def build_colormap_cache():
+    # Every OpenCV colormap as a 256-entry BGR LUT plus its encoded scale, so
+    # picking a colormap per request is a dictionary and table lookup.
+    cache = {}
+    for attr in dir(cv2):
+        if not attr.startswith("COLORMAP_"):
+            continue
+        lut = build_colormap_lut(getattr(cv2, attr))
+        scale_png, scale_etag = encode_color_scale(lut)
+        cache[attr[len("COLORMAP_"):]] = {
+            "lut": lut,
+            "scale_png": scale_png,
+            "scale_etag": scale_etag,
+        }
+    return cache
+
+COLORMAPS = build_colormap_cache()
+
+# Preforking servers set DEFER_MODEL_LOADING=1 and start the loader themselves.
+if os.environ.get("DEFER_MODEL_LOADING", "0") != "1":
+    model_loader.start()
+
+def resolve_colormap(name):
+    if name is not None and not isinstance(name, str):
+        raise ValueError(f"colormap must be a string. Supported: {', '.join(sorted(COLORMAPS))}")
+    name = (name or DEFAULT_COLORMAP).upper()
+    if name not in COLORMAPS:
+        raise ValueError(f"Unsupported colormap '{name}'. Supported: {', '.join(sorted(COLORMAPS))}")
+    return name
+
+def result_cache_key(image_bytes, colormap, cam_max_size):
+    # Everything that changes the response: image content, colormap, overlay
+    # size, model weights and rendering code.
+    digest = hashlib.sha256(
+        f"{MODEL_VERSION}:{CAM_RENDER_VERSION}:{colormap}:{cam_max_size or 'input'}:".encode()
+    )
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+def load_cached_result(cache_key):
+    # Returns (summary, cam_jpeg) or None. Rejected images have no prediction
+    # and an empty CAM.
+    if result_cache is None:
+        return None
+    value = result_cache.get(cache_key)
+    if value is None:
+        return None
+    header_size = int.from_bytes(value[:4], "big")
+    return json.loads(value[4:4 + header_size]), value[4 + header_size:]
+
+def store_cached_result(cache_key, summary, cam_jpeg=b""):
+    if result_cache is None:
+        return
+    header = json.dumps(summary).encode()
+    result_cache.put(cache_key, len(header).to_bytes(4, "big") + header + cam_jpeg)
+
+def render_cam(original_img, conv_output, predictions, colormap, cam_max_size=None):
+    no_fire_conf = float(predictions[0]) * 100
+    fire_conf = float(predictions[1]) * 100
+    pred_class = 1 if fire_conf > no_fire_conf else 0
+
+    with metrics.stage("generate_cam"):
+        cam_img = generate_cam(original_img, conv_output, pred_class, COLORMAPS[colormap]["lut"], cam_max_size)
+    with metrics.stage("jpeg_encode"):
+        ok, cam_jpeg = cv2.imencode(".jpg", cam_img)
+    if not ok:
+        raise RuntimeError("Failed to encode CAM image")
 
-def generate_cam(original_img, conv_output, pred_class):
-    weights = np.mean(conv_output[0], axis=-1)
-    weights = np.maximum(weights, 0)
-    weights /= np.max(weights)
+    summary = {
+        "prediction": "Wildfire Detected" if pred_class == 1 else "No Wildfire",
+        "noWildfireConfidence": round(no_fire_conf, 2),
+        "wildfireConfidence": round(fire_conf, 2),
+    }
+    return summary, cam_jpeg.tobytes()
 
-    heatmap = cv2.applyColorMap(np.uint8(255 * weights), COLORMAP)
-    original_img_bgr = cv2.cvtColor(original_img, cv2.COLOR_RGB2BGR)
-    heatmap = cv2.resize(heatmap, (original_img_bgr.shape[1], original_img_bgr.shape[0]))
-    cam_img = cv2.addWeighted(original_img_bgr, 0.7, heatmap, 0.3, 0)
+def build_cam_result(summary, cam_jpeg, colormap, cam_format, cache_key):
+    result = {
+        "status": "success",
+        "prediction": summary["prediction"],
+        "noWildfireConfidence": summary["noWildfireConfidence"],
+        "wildfireConfidence": summary["wildfireConfidence"],
+        "colormap": colormap,
+        "colorScale": {
+            "blue": "Low probability (0-30%)",
+            "green": "Medium probability (30-60%)",
+            "red": "High probability (60-100%)",
+            "scaleImageUrl": f"http://localhost:{PORT}/scale/color_scale.png?colormap={colormap}"
+        }
+    }
+    if cam_format == "base64":
+        result["camImageBase64"] = base64.b64encode(cam_jpeg).decode("ascii")
+    else:
+        # Named after the cache key, so a repeated image reuses one stored file
+        # and a result-cache hit does not write it again.
+        cam_filename = f"cam_{cache_key[:32]}.jpg"
+        if not cam_store.touch(cam_filename):
+            cam_store.put(cam_filename, cam_jpeg)
+        result["camImageUrl"] = f"http://localhost:{PORT}/cam/{cam_filename}"
+    return result
 
-    if pred_class == 1:
-        fire_mask = (weights > 0.5).astype(np.uint8)
-        fire_mask = cv2.resize(fire_mask, (original_img_bgr.shape[1], original_img_bgr.shape[0]))
+def run_satellite_gate(batch):
+    # Quality score per image.
+    metrics.record_inference("satellite", len(batch))
+    with metrics.stage("satellite_gate"):
+        return satellite_model.predict(batch)[:, 0]
 
-        enhanced_heatmap = cv2.addWeighted(original_img_bgr, 0.6, heatmap, 0.4, 0)
-        cam_img[fire_mask == 1] = enhanced_heatmap[fire_mask == 1]
+def run_cam_model(batch):
+    metrics.record_inference("cam", len(batch))
+    with metrics.stage("cam_forward"):
+        return cam_model.predict(batch)
 
-    return cam_img
+def request_options():
+    if request.is_json:
+        return request.get_json() or {}
+    options = request.args.to_dict()
+    options.update(request.form.to_dict())
+    return options
+
+def read_uploaded_image():
+    # Multipart "image" field, or the raw body for image/* and octet-stream posts.
+    upload = request.files.get('image')
+    if upload is not None:
+        return upload.read()
+    if request.mimetype.startswith('image/') or request.mimetype == 'application/octet-stream':
+        return request.get_data()
+    return None
+
+def resolve_cam_size(cam_size):
+    # "input" keeps the 224x224 overlay, "original" renders at source resolution
+    # and a number caps the longest side; both are bounded by CAM_MAX_OUTPUT_SIZE.
+    if cam_size in (None, "", "input"):
+        return None
+    if cam_size == "original":
+        return CAM_MAX_OUTPUT_SIZE
+    try:
+        cam_size = int(cam_size)
+    except (TypeError, ValueError):
+        raise ValueError(f"Unsupported camSize '{cam_size}'. Use 'input', 'original' or a pixel size")
+    if cam_size <= 0:
+        raise ValueError("camSize must be positive")
+    return min(cam_size, CAM_MAX_OUTPUT_SIZE)
+
+def resolve_output_options(data):
+    colormap = resolve_colormap(data.get('colormap'))
+    cam_format = data.get('camFormat', 'url')
+    if cam_format not in CAM_FORMATS:
+        raise ValueError(f"Unsupported camFormat '{cam_format}'. Supported: {', '.join(CAM_FORMATS)}")
+    return colormap, cam_format, resolve_cam_size(data.get('camSize'))
+
+def image_too_large():
+    return jsonify({"status": "error", "message": f"Image exceeds {IMAGE_FETCH_MAX_BYTES} bytes"}), 413
 
 @app.route('/predict', methods=['POST'])
+@model_loader.require_ready
 def predict():
     try:
-        data = request.get_json()
-        image_url = data.get('imageUrl')
+        try:
+            image_bytes = read_uploaded_image()
+        except RequestEntityTooLarge:
+            return image_too_large()
+        if image_bytes and len(image_bytes) > IMAGE_FETCH_MAX_BYTES:
+            return image_too_large()
+        data = request_options()
+        log_payload(logger, "predict options", data)
 
-        if not image_url:
-            return jsonify({"status": "error", "message": "Image URL required"}), 400
+        if not image_bytes and not data.get('imageUrl'):
+            return jsonify({"status": "error", "message": "Image URL or image upload required"}), 400
+        try:
+            colormap, cam_format, cam_max_size = resolve_output_options(data)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        if not image_bytes:
+            # Nothing else in this request can start before the image arrives;
+            # the fetcher gives up after IMAGE_FETCH_TOTAL_TIMEOUT.
+            try:
+                image_bytes = image_fetcher.fetch(data['imageUrl'])
+            except ImageFetchError as e:
+                return jsonify({"status": "error", "message": str(e)}), e.status_code
 
-        response = requests.get(image_url)
-        response.raise_for_status()
-        image_bytes = response.content
+        cache_key = result_cache_key(image_bytes, colormap, cam_max_size)
+        cached = load_cached_result(cache_key)
+        if cached is not None:
+            summary, cam_jpeg = cached
+        else:
+            input_tensor, original_img = preprocess_image(image_bytes, out=input_buffer(), max_size=cam_max_size)
 
-        input_tensor, original_img = preprocess_image(image_bytes)
+            quality_score = float(run_satellite_gate(input_tensor)[0])
+            if quality_score < QUALITY_THRESHOLD:
+                summary, cam_jpeg = {"imageQualityScore": quality_score}, b""
+            else:
+                conv_output, predictions = run_cam_model(input_tensor)
+                summary, cam_jpeg = render_cam(original_img, conv_output, predictions[0], colormap, cam_max_size)
+                summary["imageQualityScore"] = quality_score
+            store_cached_result(cache_key, summary, cam_jpeg)
 
-        
-        quality_score = float(satellite_model.predict(input_tensor)[0][0])
-        if quality_score < 0.8:
+        if "prediction" not in summary:
             return jsonify({
                 "status": "error",
                 "message": "Uploaded image is not suitable for wildfire detection. Please upload a clearer image.",
-                "imageQualityScore": round(quality_score, 2)
+                "imageQualityScore": round(summary["imageQualityScore"], 2)
             }), 400
 
-        
-        conv_output, predictions = cam_model.predict(input_tensor)
-        no_fire_conf = float(predictions[0][0]) * 100
-        fire_conf = float(predictions[0][1]) * 100
-        pred_class = 1 if fire_conf > no_fire_conf else 0
-
-        cam_img = generate_cam(original_img, conv_output, pred_class)
-        cam_filename = f"cam_{uuid.uuid4().hex}.jpg"
-        cam_path = os.path.join(BASE_DIR, cam_filename)
-        cv2.imwrite(cam_path, cam_img)
-
-        scale_path = generate_color_scale()
-
-        return jsonify({
-            "status": "success",
-            "prediction": "Wildfire Detected" if pred_class == 1 else "No Wildfire",
-            "noWildfireConfidence": round(no_fire_conf, 2),
-            "wildfireConfidence": round(fire_conf, 2),
-            "camImageUrl": f"http://localhost:{PORT}/cam/{cam_filename}",
-            "colorScale": {
-                "blue": "Low probability (0-30%)",
-                "green": "Medium probability (30-60%)",
-                "red": "High probability (60-100%)",
-                "scaleImageUrl": f"http://localhost:{PORT}/scale/color_scale.png"
-            }
-        })
+        return jsonify(build_cam_result(summary, cam_jpeg, colormap, cam_format, cache_key))
+
+    except Exception as e:
+        logger.exception("predict failed")
+        return jsonify({"status": "error", "message": str(e)}), 500
+
+def load_image(image_bytes=None, image_url=None, out=None, colormap=DEFAULT_COLORMAP, max_size=None):
+    # Returns (cache_key, cached result, None) on a cache hit, otherwise
+    # (cache_key, None, decoded image) with the model input written to `out`.
+    if image_bytes is None:
+        if not image_url:
+            raise ValueError("Image URL required")
+        image_bytes = image_fetcher.fetch(image_url)
+    if len(image_bytes) > IMAGE_FETCH_MAX_BYTES:
+        raise ImageFetchError(f"Image exceeds {IMAGE_FETCH_MAX_BYTES} bytes", 413)
+    cache_key = result_cache_key(image_bytes, colormap, max_size)
+    cached = load_cached_result(cache_key)
+    if cached is not None:
+        return cache_key, cached, None
+    _, original_img = preprocess_image(image_bytes, out=out, max_size=max_size)
+    # Batches hold a chunk's images until its CAM pass, so shrink to the output size now.
+    return cache_key, None, fit_to_size(original_img, max_size)
+
+def apply_batch_result(result, summary, cam_jpeg, colormap, cam_format, cache_key):
+    result["imageQualityScore"] = round(summary["imageQualityScore"], 2)
+    if "prediction" not in summary:
+        result.update(status="rejected", message="Image is not suitable for wildfire detection.")
+    else:
+        result.update(build_cam_result(summary, cam_jpeg, colormap, cam_format, cache_key))
+
+def collect_batch_sources(data):
+    # Multipart "images" files, or a JSON list of URLs / {"id", "imageUrl"} objects.
+    uploads = request.files.getlist('images')
+    if uploads:
+        return [(upload.filename or str(i), upload.read(), None) for i, upload in enumerate(uploads)]
+
+    images = data.get('images') or []
+    if not isinstance(images, list):
+        raise ValueError("images must be a list")
+    sources = []
+    for i, item in enumerate(images):
+        if isinstance(item, str):
+            sources.append((str(i), None, item))
+        elif isinstance(item, dict) and isinstance(item.get('imageUrl'), (str, type(None))):
+            sources.append((str(item.get('id', i)), None, item.get('imageUrl')))
+        else:
+            raise ValueError(f"images[{i}] must be a URL or an object with an imageUrl")
+    return sources
+
+def load_batch_chunk(sources, indices, colormap, cam_max_size):
+    # Starts loading sources[indices], each straight into its row of a tensor
+    # for this chunk alone. Uploaded bytes decode on the CPU-sized pool; URLs
+    # are fetched and decoded on the I/O pool so slow origins don't starve
+    # decoding.
+    inputs = np.empty((len(indices),) + INPUT_SHAPE, dtype=np.float32)
+    futures = [
+        (decode_executor if sources[index][1] is not None else image_fetcher.executor).submit(
+            load_image, sources[index][1], sources[index][2], inputs[row], colormap, cam_max_size
+        )
+        for row, index in enumerate(indices)
+    ]
+    return indices, inputs, futures, time.monotonic() + IMAGE_FETCH_TOTAL_TIMEOUT
+
+def run_batch_chunk(chunk, results, colormap, cam_format, cam_max_size):
+    # Satellite gate over the chunk's decoded images, then CAM and overlays
+    # for those that passed.
+    indices, inputs, futures, deadline = chunk
+    wait(futures, timeout=max(0, deadline - time.monotonic()))
+    decoded = []
+    for row, (index, future) in enumerate(zip(indices, futures)):
+        if not future.done():
+            future.cancel()
+            results[index].update(status="error", message="Timed out fetching image")
+            continue
+        try:
+            cache_key, cached, original_img = future.result()
+        except Exception as e:
+            results[index].update(status="error", message=str(e))
+            continue
+        if cached is not None:
+            apply_batch_result(results[index], *cached, colormap, cam_format, cache_key)
+        else:
+            decoded.append((row, index, cache_key, original_img))
+    if not decoded:
+        return
+
+    passed = []
+    quality_scores = run_satellite_gate(inputs[[row for row, _, _, _ in decoded]])
+    for item, quality_score in zip(decoded, quality_scores):
+        _, index, cache_key, _ = item
+        if quality_score < QUALITY_THRESHOLD:
+            summary = {"imageQualityScore": float(quality_score)}
+            store_cached_result(cache_key, summary)
+            apply_batch_result(results[index], summary, b"", colormap, cam_format, cache_key)
+        else:
+            passed.append((item, float(quality_score)))
+    if not passed:
+        return
+
+    conv_output, predictions = run_cam_model(inputs[[item[0] for item, _ in passed]])
+    for offset, ((_, index, cache_key, original_img), quality_score) in enumerate(passed):
+        summary, cam_jpeg = render_cam(
+            original_img, conv_output[offset:offset + 1], predictions[offset], colormap, cam_max_size
+        )
+        summary["imageQualityScore"] = quality_score
+        store_cached_result(cache_key, summary, cam_jpeg)
+        apply_batch_result(results[index], summary, cam_jpeg, colormap, cam_format, cache_key)
+
+@app.route('/predict_batch', methods=['POST'])
+@model_loader.require_ready
+def predict_batch():
+    try:
+        try:
+            data = request_options()
+            sources = collect_batch_sources(data)
+        except RequestEntityTooLarge:
+            return jsonify({"status": "error", "message": f"Upload exceeds {IMAGE_BATCH_MAX_UPLOAD_BYTES} bytes"}), 413
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+        log_payload(logger, "predict_batch options", data)
+
+        if not sources:
+            return jsonify({"status": "error", "message": "At least one image is required"}), 400
+        if len(sources) > IMAGE_BATCH_MAX_IMAGES:
+            return jsonify({"status": "error", "message": f"At most {IMAGE_BATCH_MAX_IMAGES} images per request"}), 400
+
+        try:
+            colormap, cam_format, cam_max_size = resolve_output_options(data)
+        except ValueError as e:
+            return jsonify({"status": "error", "message": str(e)}), 400
+
+        # One IMAGE_BATCH_MAX_SIZE chunk at a time, so the input tensors and
+        # decoded frames held at once depend on the chunk size rather than the
+        # batch size. The next chunk loads while this one runs through the models.
+        results = [{"id": image_id} for image_id, _, _ in sources]
+        chunks = [
+            range(start, min(start + IMAGE_BATCH_MAX_SIZE, len(sources)))
+            for start in range(0, len(sources), IMAGE_BATCH_MAX_SIZE)
+        ]
+        pending = load_batch_chunk(sources, chunks[0], colormap, cam_max_size)
+        for position in range(len(chunks)):
+            chunk = pending
+            if position + 1 < len(chunks):
+                pending = load_batch_chunk(sources, chunks[position + 1], colormap, cam_max_size)
+            run_batch_chunk(chunk, results, colormap, cam_format, cam_max_size)
+
+        return jsonify({"status": "success", "results": results})
 
     except Exception as e:
+        logger.exception("predict_batch failed")
         return jsonify({"status": "error", "message": str(e)}), 500
 
 @app.route('/cam/<filename>')
 def serve_cam(filename):
-    cam_path = os.path.join(BASE_DIR, filename)
-    if os.path.exists(cam_path):
-        return send_file(cam_path, mimetype='image/jpeg')
-    return jsonify({"status": "error", "message": "Image not found"}), 404
+    cam_jpeg = cam_store.get(filename)
+    if cam_jpeg is None:
+        return jsonify({"status": "error", "message": "Image not found"}), 404
+    return Response(cam_jpeg, mimetype='image/jpeg')
 
 @app.route('/scale/color_scale.png')
 def serve_color_scale():
-    scale_path = os.path.join(BASE_DIR, "color_scale.png")
-    if os.path.exists(scale_path):
-        return send_file(scale_path, mimetype='image/png')
-    return jsonify({"status": "error", "message": "Color scale not found"}), 404
+    try:
+        colormap = COLORMAPS[resolve_colormap(request.args.get('colormap'))]
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 404
+
+    response = make_response(colormap["scale_png"])
+    response.mimetype = 'image/png'
+    response.set_etag(colormap["scale_etag"])
+    response.cache_control.public = True
+    response.cache_control.max_age = COLOR_SCALE_MAX_AGE
+    return response.make_conditional(request)
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=PORT, debug=True)
+    app.run(host='0.0.0.0', port=PORT, debug=os.environ.get("FLASK_DEBUG", "0") == "1")
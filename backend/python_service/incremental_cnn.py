@@ -0,0 +1,382 @@
+"""NumPy re-implementation of the timestep CNNs that can reuse activations.
+
+A model is split into sequence layers (Conv1D, pooling and per-timestep
+layers such as BatchNormalization or Dense on a 3-D input) and a head that
+starts at the first Flatten / GlobalPooling1D layer. Every sequence layer
+output position depends on a known window of input positions, so when the
+input only changes in some rows, positions whose window is unchanged can be
+copied from a reference pass instead of recomputed.
+
+Two references are available to `forward`:
+
+* the activations of the window one step earlier: after a one-day slide only
+  the positions that see the new row (or the left border) are recomputed, up
+  to the first layer whose stride does not divide the shift;
+* after `set_padding_row`, one pass over a window made only of padding rows:
+  a short history left-padded to 143 rows only recomputes the positions whose
+  window reaches a real row.
+
+Positions are computed row by row, so the result is bit-identical to the full
+pass either way. Models with layers outside the supported set, or whose graph
+is not a single chain, raise UnsupportedModelError.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+class UnsupportedModelError(ValueError):
+    pass
+
+
+def _sigmoid(x):
+    return 1 / (1 + np.exp(-x))
+
+
+def _softmax(x):
+    e = np.exp(x - x.max(axis=-1, keepdims=True))
+    return e / e.sum(axis=-1, keepdims=True)
+
+
+def _rowwise_matmul(x, kernel):
+    # One vector-matrix product per row, so each row's rounding is the same no
+    # matter how many rows are computed together (a plain x @ kernel lets BLAS
+    # pick a different kernel for 1 row than for 100). That is what makes a
+    # partial recompute bit-identical to the full pass.
+    return np.matmul(x[..., np.newaxis, :], kernel)[..., 0, :]
+
+
+ACTIVATIONS = {
+    "linear": lambda x: x,
+    "relu": lambda x: np.maximum(x, 0),
+    "sigmoid": _sigmoid,
+    "tanh": np.tanh,
+    "elu": lambda x: np.where(x > 0, x, np.expm1(np.minimum(x, 0))),
+    "swish": lambda x: x * _sigmoid(x),
+    "silu": lambda x: x * _sigmoid(x),
+    "softplus": lambda x: np.logaddexp(x, 0),
+    "softmax": _softmax,
+}
+
+# Layers that are the identity at inference time.
+INFERENCE_IDENTITY_LAYERS = {
+    "InputLayer", "Dropout", "SpatialDropout1D", "GaussianNoise", "GaussianDropout",
+    "AlphaDropout", "ActivityRegularization",
+}
+
+
+def _activation(name):
+    if not isinstance(name, str) or name not in ACTIVATIONS:
+        raise UnsupportedModelError(f"Unsupported activation {name!r}")
+    return ACTIVATIONS[name]
+
+
+def _as_int(value):
+    return int(value[0] if isinstance(value, (list, tuple)) else value)
+
+
+class WindowOp:
+    """Sequence layer where output p reads inputs p*stride - pad_left + j*dilation."""
+
+    span = 1
+    stride = 1
+
+    def output_length(self, length):
+        return length
+
+    def pad_left(self, length):
+        return 0
+
+    def compute(self, h, start, stop):
+        raise NotImplementedError
+
+
+class PointwiseOp(WindowOp):
+    def __init__(self, fn):
+        self.fn = fn
+
+    def compute(self, h, start, stop):
+        return self.fn(h[:, start:stop])
+
+
+class Conv1DOp(WindowOp):
+    def __init__(self, kernel, bias, stride, dilation, padding, activation):
+        if padding == "causal" and stride != 1:
+            raise UnsupportedModelError("Strided causal convolutions are not supported")
+        # (in * k, out), matching the flattened (in, k) patches below.
+        self.kernel = np.ascontiguousarray(kernel.transpose(1, 0, 2), dtype=np.float32).reshape(-1, kernel.shape[2])
+        self.bias = None if bias is None else bias.astype(np.float32)
+        self.stride = stride
+        self.dilation = dilation
+        self.padding = padding
+        self.activation = activation
+        self.span = (kernel.shape[0] - 1) * dilation + 1
+
+    def output_length(self, length):
+        if self.padding == "valid":
+            return (length - self.span) // self.stride + 1
+        if self.padding == "same":
+            return math.ceil(length / self.stride)
+        return length
+
+    def pad_left(self, length):
+        if self.padding == "causal":
+            return self.span - 1
+        if self.padding == "same":
+            total = max((self.output_length(length) - 1) * self.stride + self.span - length, 0)
+            return total // 2
+        return 0
+
+    def compute(self, h, start, stop):
+        length = h.shape[1]
+        first = start * self.stride - self.pad_left(length)
+        last = (stop - 1) * self.stride - self.pad_left(length) + self.span
+        window = h[:, max(first, 0):min(last, length)]
+        if first < 0 or last > length:
+            window = np.pad(window, ((0, 0), (max(0, -first), max(0, last - length)), (0, 0)))
+        patches = sliding_window_view(window, self.span, axis=1)[:, ::self.stride, :, ::self.dilation]
+        out = _rowwise_matmul(patches.reshape(patches.shape[:2] + (-1,)), self.kernel)
+        if self.bias is not None:
+            out += self.bias
+        return self.activation(out)
+
+
+class Pool1DOp(WindowOp):
+    def __init__(self, reduce, pool_size, stride):
+        self.reduce = reduce
+        self.span = pool_size
+        self.stride = stride
+
+    def output_length(self, length):
+        return (length - self.span) // self.stride + 1
+
+    def compute(self, h, start, stop):
+        window = h[:, start * self.stride:(stop - 1) * self.stride + self.span]
+        patches = sliding_window_view(window, self.span, axis=1)[:, ::self.stride]
+        return self.reduce(patches, axis=-1)
+
+
+def _dense_fn(layer, config):
+    weights = layer.get_weights()
+    kernel = weights[0].astype(np.float32)
+    bias = weights[1].astype(np.float32) if config.get("use_bias", True) else None
+    activation = _activation(config.get("activation", "linear"))
+
+    def dense(x):
+        out = _rowwise_matmul(x, kernel)
+        if bias is not None:
+            out += bias
+        return activation(out)
+    return dense
+
+
+def _batch_norm_fn(layer, config):
+    # Folded into one affine map; a non-feature axis fails the parity check.
+    scale = 1 / np.sqrt(np.asarray(layer.moving_variance) + config.get("epsilon", 1e-3))
+    if config.get("scale", True):
+        scale = scale * np.asarray(layer.gamma)
+    offset = -np.asarray(layer.moving_mean) * scale
+    if config.get("center", True):
+        offset = offset + np.asarray(layer.beta)
+    scale = scale.astype(np.float32)
+    offset = offset.astype(np.float32)
+    return lambda x: x * scale + offset
+
+
+def _build_op(layer):
+    # Returns ("sequence" | "reduce" | "pointwise", op) or None for identity layers.
+    kind = type(layer).__name__
+    config = layer.get_config()
+    if kind in INFERENCE_IDENTITY_LAYERS:
+        return None
+    if config.get("data_format", "channels_last") != "channels_last":
+        raise UnsupportedModelError(f"{layer.name}: only channels_last is supported")
+
+    if kind == "Conv1D":
+        if config.get("groups", 1) != 1:
+            raise UnsupportedModelError(f"{layer.name}: grouped convolutions are not supported")
+        weights = layer.get_weights()
+        bias = weights[1] if config.get("use_bias", True) else None
+        return "sequence", Conv1DOp(
+            weights[0], bias,
+            stride=_as_int(config["strides"]),
+            dilation=_as_int(config.get("dilation_rate", 1)),
+            padding=config["padding"],
+            activation=_activation(config.get("activation", "linear")),
+        )
+    if kind in ("MaxPooling1D", "AveragePooling1D"):
+        if config["padding"] != "valid":
+            raise UnsupportedModelError(f"{layer.name}: only 'valid' pooling is supported")
+        pool_size = _as_int(config["pool_size"])
+        stride = _as_int(config.get("strides") or pool_size)
+        return "sequence", Pool1DOp(np.max if kind == "MaxPooling1D" else np.mean, pool_size, stride)
+    if kind == "GlobalAveragePooling1D":
+        return "reduce", lambda x: x.mean(axis=1)
+    if kind == "GlobalMaxPooling1D":
+        return "reduce", lambda x: x.max(axis=1)
+    if kind == "Flatten":
+        return "reduce", lambda x: x.reshape(x.shape[0], -1)
+    if kind == "Dense":
+        return "pointwise", _dense_fn(layer, config)
+    if kind == "BatchNormalization":
+        return "pointwise", _batch_norm_fn(layer, config)
+    if kind == "Activation":
+        return "pointwise", _activation(config["activation"])
+    if kind == "ReLU" and not config.get("max_value") and not config.get("negative_slope") and not config.get("threshold"):
+        return "pointwise", ACTIVATIONS["relu"]
+    raise UnsupportedModelError(f"{layer.name}: unsupported layer type {kind}")
+
+
+class IncrementalCNN:
+    def __init__(self, keras_model, tolerance=1e-5):
+        if len(keras_model.inputs) != 1 or len(keras_model.outputs) != 1:
+            raise UnsupportedModelError("Only single-input, single-output models are supported")
+
+        self.sequence_ops = []
+        self.head = []
+        for layer in keras_model.layers:
+            built = _build_op(layer)
+            if built is None:
+                continue
+            role, op = built
+            if self.head or role == "reduce":
+                if role == "sequence":
+                    raise UnsupportedModelError(f"{layer.name}: sequence layer after the pooling head")
+                self.head.append(op)
+            elif role == "sequence":
+                self.sequence_ops.append(op)
+            else:
+                self.sequence_ops.append(PointwiseOp(op))
+        if not self.head:
+            raise UnsupportedModelError("Model has no Flatten or GlobalPooling1D layer")
+
+        self.input_shape = tuple(keras_model.input_shape[1:])
+        self.padding_row = None
+        self.padding_activations = None
+        _, activations = self._forward(np.zeros((1,) + self.input_shape, dtype=np.float32))
+        self.activation_shapes = [a.shape[1:] for a in activations]
+        self._sizes = [int(np.prod(shape)) for shape in self.activation_shapes]
+        self._check_parity(keras_model, tolerance)
+
+    def _check_parity(self, keras_model, tolerance):
+        # Catches anything the layer walk cannot see, e.g. skip connections.
+        sample = np.random.default_rng(0).standard_normal((2,) + self.input_shape).astype(np.float32)
+        expected = np.asarray(keras_model(sample, training=False))
+        actual = self.predict(sample)
+        if actual.shape != expected.shape or not np.allclose(actual, expected, rtol=tolerance, atol=tolerance):
+            raise UnsupportedModelError(f"{keras_model.name}: layer-by-layer pass does not reproduce the model")
+
+    def _forward(self, batch, references=None):
+        # references[i] lists (lo, hi, values) segments holding the exact
+        # activations of sequence layer i for output positions [lo, hi);
+        # only the positions no segment covers are computed.
+        h = np.asarray(batch, dtype=np.float32)
+        activations = []
+        for i, op in enumerate(self.sequence_ops):
+            length = op.output_length(h.shape[1])
+            segments = references[i] if references is not None else None
+            if not segments:
+                out = op.compute(h, 0, length)
+            else:
+                out = np.empty((h.shape[0], length) + segments[0][2].shape[2:], dtype=np.float32)
+                covered = 0
+                for lo, hi, values in sorted(segments, key=lambda segment: segment[0]):
+                    if lo > covered:
+                        out[:, covered:lo] = op.compute(h, covered, lo)
+                    if hi > covered:
+                        start = max(lo, covered)
+                        out[:, start:hi] = values[:, start - lo:]
+                        covered = hi
+                if covered < length:
+                    out[:, covered:] = op.compute(h, covered, length)
+            activations.append(out)
+            h = out
+        for fn in self.head:
+            h = fn(h)
+        return h, activations
+
+    def set_padding_row(self, row):
+        """Precompute every layer over a window of nothing but `row`, the
+        (normalized) row short histories are left-padded with."""
+        self.padding_row = np.asarray(row, dtype=np.float32)
+        window = np.broadcast_to(self.padding_row, (1,) + self.input_shape)
+        _, self.padding_activations = self._forward(window)
+
+    def leading_padding_rows(self, batch):
+        # Rows at the start of every window in the batch that equal the padding row.
+        is_padding = np.all(batch == self.padding_row, axis=2)
+        first_real = np.where(is_padding.all(axis=1), is_padding.shape[1], is_padding.argmin(axis=1))
+        return int(first_real.min())
+
+    def prefix_plan(self, padding_rows):
+        """Per sequence layer, how many leading output positions only read padding."""
+        plan = []
+        length = self.input_shape[0]
+        hi = padding_rows
+        for op in self.sequence_ops:
+            out_length = op.output_length(length)
+            hi = max(0, min(out_length, (hi + op.pad_left(length) - op.span) // op.stride + 1))
+            plan.append(hi)
+            length = out_length
+        return plan
+
+    def predict(self, batch):
+        return self.forward(batch)[0]
+
+    def slide_plan(self, shift=1):
+        """Per sequence layer, the output positions [lo, hi) that equal the
+        previous window's activations at [lo + shift_i, hi + shift_i), as
+        (lo, hi, shift_i), or None from the first layer nothing carries over."""
+        plan = []
+        length = self.input_shape[0]
+        lo, hi = 0, length - shift
+        for op in self.sequence_ops:
+            out_length = op.output_length(length)
+            pad_left = op.pad_left(length)
+            if shift % op.stride or hi <= lo:
+                plan.extend([None] * (len(self.sequence_ops) - len(plan)))
+                break
+            lo = max(0, -(-(lo + pad_left) // op.stride))
+            hi = min(out_length, (hi + pad_left - op.span) // op.stride + 1)
+            shift //= op.stride
+            plan.append((lo, hi, shift) if hi > lo else None)
+            length = out_length
+        return plan
+
+    def forward(self, batch, previous=None, shift=1):
+        """Return the output and every sequence layer's activations.
+
+        `previous`, if given, holds the stacked activations (from forward() or
+        stack()) of the windows these are moved on from by `shift` rows. The
+        padding prefix is reused whenever set_padding_row() has been called.
+        """
+        batch = np.asarray(batch, dtype=np.float32)
+        references = [[] for _ in self.sequence_ops]
+        if previous is not None:
+            for segments, step, prev in zip(references, self.slide_plan(shift), previous):
+                if step is not None:
+                    lo, hi, layer_shift = step
+                    segments.append((lo, hi, prev[:, lo + layer_shift:hi + layer_shift]))
+        if self.padding_activations is not None:
+            padding_rows = self.leading_padding_rows(batch)
+            for segments, hi, padding in zip(references, self.prefix_plan(padding_rows), self.padding_activations):
+                if hi > 0:
+                    segments.append((0, hi, padding[:, :hi]))
+        return self._forward(batch, references)
+
+    def pack(self, activations, index):
+        return b"".join(layer[index].tobytes() for layer in activations)
+
+    def unpack(self, buffer):
+        flat = np.frombuffer(buffer, dtype=np.float32)
+        layers = []
+        offset = 0
+        for size, shape in zip(self._sizes, self.activation_shapes):
+            layers.append(flat[offset:offset + size].reshape(shape))
+            offset += size
+        return layers
+
+    def stack(self, unpacked):
+        # One (batch, length, channels) array per layer from per-window activations.
+        return [np.stack(layer) for layer in zip(*unpacked)]
@@ -0,0 +1,24 @@
+import os
+
+# Threads each process gives TensorFlow / TFLite. 0 keeps the library default
+# (every core), which oversubscribes the CPU once several workers share it.
+INFERENCE_INTRA_OP_THREADS = int(os.environ.get("INFERENCE_INTRA_OP_THREADS", 0))
+INFERENCE_INTER_OP_THREADS = int(os.environ.get("INFERENCE_INTER_OP_THREADS", 0))
+
+
+def configure_tensorflow_threads():
+    # Must run before TensorFlow executes its first op in this process.
+    import tensorflow as tf
+
+    try:
+        if INFERENCE_INTRA_OP_THREADS:
+            tf.config.threading.set_intra_op_parallelism_threads(INFERENCE_INTRA_OP_THREADS)
+        if INFERENCE_INTER_OP_THREADS:
+            tf.config.threading.set_inter_op_parallelism_threads(INFERENCE_INTER_OP_THREADS)
+    except RuntimeError:
+        # The runtime is already initialised; keep whatever it started with.
+        pass
+
+
+def tflite_num_threads():
+    return INFERENCE_INTRA_OP_THREADS or None
@@ -1,123 +1,262 @@
+import functools
+import hashlib
+import logging
 import os
 import joblib
-import pandas as pd
 import numpy as np
 from flask import Flask, request, jsonify
-import tensorflow as tf
-from sklearn.preprocessing import MinMaxScaler
-from tensorflow.keras.models import load_model
 
-def mse(y_true, y_pred):
-    return tf.reduce_mean(tf.square(y_true - y_pred))
+from batcher import MicroBatcher
+from incremental_cnn import IncrementalCNN, UnsupportedModelError
+from inference_threads import configure_tensorflow_threads, tflite_num_threads
+from model_loader import ModelLoader
+from result_store import ResultStore
+from service_logging import configure_logging, log_payload, register_request_logging
+from service_metrics import ServiceMetrics
+from timestep_features import FEATURE_COLUMNS, REQUIRED_TIMESTEPS, FeatureScaling, fill_sequence
+from timestep_models import (
+    NORMALIZATION_FILE,
+    TIMESTEP_MODEL_FILES,
+    load_fused_pipeline,
+    load_timestep_model,
+    model_version,
+)
 
+# "keras" loads the .h5 models with TensorFlow, "tflite" loads the files
+# produced by export_models.py without the Keras stack.
+MODEL_RUNTIME = os.environ.get("MODEL_RUNTIME", "keras")
+# Run classifier and both regressors as one graph that selects the output itself.
+FUSED_PIPELINE = os.environ.get("FUSED_PIPELINE", "0") == "1"
+PREDICT_BATCH_MAX_SIZE = int(os.environ.get("PREDICT_BATCH_MAX_SIZE", 32))
+PREDICT_BATCH_MAX_WAIT_MS = float(os.environ.get("PREDICT_BATCH_MAX_WAIT_MS", 5))
+# Set PREDICTION_CACHE_MAX_ITEMS=0 to disable the prediction cache.
+PREDICTION_CACHE_MAX_ITEMS = int(os.environ.get("PREDICTION_CACHE_MAX_ITEMS", 4096))
+PREDICTION_CACHE_TTL_SECONDS = float(os.environ.get("PREDICTION_CACHE_TTL_SECONDS", 24 * 3600))
+# Keep each window's convolution activations so the next day's window, which
+# is the same rows moved on by one, only recomputes what the new row touches.
+# Keras runtime without FUSED_PIPELINE only. Applies to the regressors: the
+# classifier always runs on the runtime's own model, so routing between them
+# is exactly that of the plain path.
+INCREMENTAL_INFERENCE = os.environ.get("INCREMENTAL_INFERENCE", "0") == "1"
+# Reuse one precomputed pass over an all-padding window, so short histories
+# only compute the positions their real rows reach. Same runtime restrictions.
+PADDING_PREFIX_REUSE = os.environ.get("PADDING_PREFIX_REUSE", "0") == "1"
+ACTIVATION_CACHE_MAX_ITEMS = int(os.environ.get("ACTIVATION_CACHE_MAX_ITEMS", 8192))
+ACTIVATION_CACHE_MAX_BYTES = int(os.environ.get("ACTIVATION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+ACTIVATION_CACHE_TTL_SECONDS = float(os.environ.get("ACTIVATION_CACHE_TTL_SECONDS", 3 * 24 * 3600))
+# Written through to this directory so every process sharing it (gunicorn
+# workers) can slide from a window another one computed. Without it each
+# worker only sees the updates it handled itself.
+ACTIVATION_CACHE_DIR = os.environ.get("ACTIVATION_CACHE_DIR")
+ACTIVATION_CACHE_DIR_MAX_ITEMS = int(os.environ.get("ACTIVATION_CACHE_DIR_MAX_ITEMS", 65536))
 
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "../wildfireModel")
+configure_logging()
+logger = logging.getLogger("model_api")
+metrics = ServiceMetrics("model_api")
 
+# TFLite interpreters created before fork() keep working in the children;
+# TensorFlow models do not, so gunicorn_conf.py loads those in each worker.
+MODELS_FORK_SAFE = MODEL_RUNTIME == "tflite"
 
-classification_model_path = "classification_cnn_model_new1.h5"
-cnn_lse_model_path = "cnn_lse_reg.h5"
-cnn_sfe_model_path = "cnn_sfe_reg.h5"
+classification_model = cnn_lse_model = cnn_sfe_model = fused_pipeline = None
+incremental_models = {}
+# Digest of the weight files, set by the loader once they have loaded.
+MODEL_VERSION = None
+# Which code computes the regressor outputs. Part of the prediction cache key,
+# because the NumPy engine and the runtime agree only to float rounding.
+INFERENCE_ENGINE = None
 
+# Models whose sequence layers may run on the incremental NumPy engine.
+INCREMENTAL_MODELS = ("cnn_lse", "cnn_sfe")
 
-classification_model_file = os.path.join(MODEL_DIR, classification_model_path)
-cnn_lse_model_file = os.path.join(MODEL_DIR, cnn_lse_model_path)
-cnn_sfe_model_file = os.path.join(MODEL_DIR, cnn_sfe_model_path)
+def build_incremental_models(models):
+    engines = {}
+    for name in INCREMENTAL_MODELS:
+        model = models[name]
+        try:
+            engine = IncrementalCNN(model.model)
+        except UnsupportedModelError as e:
+            logger.warning("Incremental inference disabled for %s: %s", name, e)
+            continue
+        if PADDING_PREFIX_REUSE:
+            engine.set_padding_row(build_sequence([])[0])
+        engines[name] = engine
+    return engines
 
+def warm_up_models(models):
+    global classification_model, cnn_lse_model, cnn_sfe_model, fused_pipeline, MODEL_VERSION, INFERENCE_ENGINE
+    if FUSED_PIPELINE:
+        models["fused"] = load_fused_pipeline(MODEL_RUNTIME, models, num_threads=tflite_num_threads())
+    # The first call traces each graph / allocates each interpreter.
+    dummy_batch = np.zeros((1, REQUIRED_TIMESTEPS, len(FEATURE_COLUMNS)), dtype=np.float32)
+    for model in models.values():
+        model.predict(dummy_batch)
+    MODEL_VERSION = model_version(MODEL_RUNTIME, FUSED_PIPELINE)
+    if (INCREMENTAL_INFERENCE or PADDING_PREFIX_REUSE) and MODEL_RUNTIME == "keras" and not FUSED_PIPELINE:
+        incremental_models.update(build_incremental_models(models))
+    engine = [MODEL_RUNTIME] + (["fused"] if FUSED_PIPELINE else [])
+    INFERENCE_ENGINE = "+".join(engine + [f"numpy:{name}" for name in sorted(incremental_models)])
+    cnn_lse_model = models["cnn_lse"]
+    cnn_sfe_model = models["cnn_sfe"]
+    fused_pipeline = models.get("fused")
+    classification_model = models["classification"]
 
-classification_model = load_model(classification_model_file, custom_objects={'mse': mse})
-cnn_lse_model = load_model(cnn_lse_model_file, custom_objects={'mse': mse})
-cnn_sfe_model = load_model(cnn_sfe_model_file, custom_objects={'mse': mse})
+model_loader = ModelLoader(
+    {
+        name: functools.partial(load_timestep_model, name, MODEL_RUNTIME, tflite_num_threads())
+        for name in TIMESTEP_MODEL_FILES
+    },
+    warmup=warm_up_models,
+    setup=configure_tensorflow_threads if MODEL_RUNTIME == "keras" else None,
+)
 
-FEATURE_COLUMNS = [
-    "tmax", "rh", "ws", "vpd", "fwi", "isi", "bui", "closure",
-    "biomass", "slope", "fire_intensity_ratio", "pctgrowth_capped",
-    "day_frac", "firearea", "fwi_prev1", "fwi_prev2", "rh_prev1", "rh_prev2",
-    "prevGrowth" 
-]
-assert len(FEATURE_COLUMNS) == 19, "FEATURE_COLUMNS list must have 19 features as per model's expected input."
+# Predictions keyed by the padded, normalized input, so reopening a location
+# whose FireData has not changed skips inference.
+prediction_cache = ResultStore(
+    max_items=PREDICTION_CACHE_MAX_ITEMS,
+    ttl_seconds=PREDICTION_CACHE_TTL_SECONDS,
+) if PREDICTION_CACHE_MAX_ITEMS > 0 else None
 
-scaler = MinMaxScaler(feature_range=(0, 1))
-scaler.fit(np.zeros((1, len(FEATURE_COLUMNS)))) 
+# Per-window sequence activations for incremental inference, keyed by the
+# rows the next day's window will share with this one.
+activation_cache = ResultStore(
+    max_items=ACTIVATION_CACHE_MAX_ITEMS,
+    max_bytes=ACTIVATION_CACHE_MAX_BYTES,
+    ttl_seconds=ACTIVATION_CACHE_TTL_SECONDS,
+    spill_dir=ACTIVATION_CACHE_DIR,
+    spill_max_items=ACTIVATION_CACHE_DIR_MAX_ITEMS,
+    write_through=True,
+) if INCREMENTAL_INFERENCE else None
+
+if os.path.exists(NORMALIZATION_FILE):
+    feature_scaling = FeatureScaling.load(NORMALIZATION_FILE)
+else:
+    logger.warning("%s not found; serving unscaled features (run fit_normalization.py)", NORMALIZATION_FILE)
+    feature_scaling = FeatureScaling.identity()
 app = Flask(__name__)
+register_request_logging(app, logger)
+metrics.register(app)
+model_loader.register_health_routes(app)
+
+def normalize_input(sequence):
+    return feature_scaling.transform(sequence)
+
+def denormalize_output(outputs):
+    # (n, 1) regressor outputs, in place; returns one (1,) prediction per row.
+    return list(feature_scaling.inverse_target(np.asarray(outputs, dtype=np.float32)))
+
+def build_sequence(entries, out=None):
+    with metrics.stage("sequence_build"):
+        sequence = fill_sequence(entries, out)
+    with metrics.stage("scaling"):
+        return normalize_input(sequence)
+
+def prediction_cache_key(sequence):
+    # The float32 (143, 19) buffer is already canonical: padding, column order
+    # and normalization are fixed by build_sequence.
+    digest = hashlib.sha256(f"{MODEL_VERSION}:{INFERENCE_ENGINE}:".encode())
+    digest.update(np.ascontiguousarray(sequence).data)
+    return digest.hexdigest()
+
+def load_cached_prediction(cache_key):
+    if prediction_cache is None:
+        return None
+    value = prediction_cache.get(cache_key)
+    return None if value is None else np.frombuffer(value, dtype=np.float64)
+
+def store_cached_prediction(cache_key, output):
+    if prediction_cache is not None:
+        prediction_cache.put(cache_key, np.asarray(output, dtype=np.float64).tobytes())
+
+def activation_cache_key(model_name, rows):
+    digest = hashlib.sha256(f"{MODEL_VERSION}:{model_name}:".encode())
+    digest.update(np.ascontiguousarray(rows).data)
+    return digest.hexdigest()
+
+def predict_incremental(model_name, engine, batch):
+    # Windows whose first 142 rows are the last 142 rows of a cached window
+    # slide from its activations; the rest run a full pass. Either way the
+    # new activations are cached for tomorrow's window.
+    if activation_cache is None:
+        return engine.predict(batch)
+    cached = [activation_cache.get(activation_cache_key(model_name, sequence[:-1])) for sequence in batch]
+    sliding = [i for i, value in enumerate(cached) if value is not None]
+    fresh = [i for i, value in enumerate(cached) if value is None]
 
-def normalize_input(data_df):
-    
-    return scaler.transform(data_df.values)
+    results = [None] * len(batch)
 
-def denormalize_output(scaled_data):
-    
-    if scaled_data.ndim == 1:
-        scaled_data = scaled_data.reshape(-1, 1) 
+    def collect(indices, outputs, activations):
+        for offset, i in enumerate(indices):
+            results[i] = outputs[offset]
+            activation_cache.put(activation_cache_key(model_name, batch[i][1:]), engine.pack(activations, offset))
 
-    dummy_array_for_inverse = np.zeros((scaled_data.shape[0], len(FEATURE_COLUMNS)))
-    
-    dummy_array_for_inverse[:, 0] = scaled_data.flatten()
-    return scaler.inverse_transform(dummy_array_for_inverse)[:, 0]
+    if sliding:
+        previous = engine.stack([engine.unpack(cached[i]) for i in sliding])
+        collect(sliding, *engine.forward(batch[sliding], previous))
+    if fresh:
+        collect(fresh, *engine.forward(batch[fresh]))
+    return np.stack(results)
+
+def predict_with(model_name, model, batch):
+    metrics.record_inference(model_name, len(batch))
+    engine = incremental_models.get(model_name)
+    if engine is None:
+        return model.predict(batch)
+    return predict_incremental(model_name, engine, batch)
+
+def run_inference_batch(sequences):
+    # One stacked classifier pass for every sequence collected by the batcher.
+    batch = np.stack(sequences)
+    if fused_pipeline is not None:
+        metrics.record_inference("fused", len(batch))
+        with metrics.stage("fused_pipeline"):
+            return denormalize_output(fused_pipeline.predict(batch))
+
+    with metrics.stage("classifier"):
+        classification_output = predict_with("classification", classification_model, batch)
+
+    # Partition by regime so each regressor runs once on its own subset,
+    # then scatter the outputs back into request order.
+    use_lse = classification_output[:, 0] > classification_output[:, 1]
+    results = [None] * len(batch)
+    for model_name, selected_model, mask in (
+        ("cnn_lse", cnn_lse_model, use_lse),
+        ("cnn_sfe", cnn_sfe_model, ~use_lse),
+    ):
+        indices = np.flatnonzero(mask)
+        if len(indices) == 0:
+            continue
+        with metrics.stage("regressor"):
+            cnn_output = denormalize_output(predict_with(model_name, selected_model, batch[indices]))
+        for index, output in zip(indices, cnn_output):
+            results[index] = output
+    return results
+
+predict_batcher = MicroBatcher(
+    run_inference_batch,
+    max_batch_size=PREDICT_BATCH_MAX_SIZE,
+    max_wait_ms=PREDICT_BATCH_MAX_WAIT_MS,
+    name="predict-batcher",
+)
 
 
 @app.route("/predict", methods=["POST"])
+@model_loader.require_ready
 def predict():
     try:
-        input_json = request.get_json(force=True)
-        print("Received JSON input:")
-        print(input_json)
-
-        processed_data_points = []
-        for entry in input_json['data']:
-            single_timestep_data = {
-                "tmax": entry['tmax'],
-                "rh": entry['rh'],
-                "ws": entry['ws'],
-                "vpd": entry['vpd'],
-                "fwi": entry['fwi'],
-                "isi": entry['isi'],
-                "bui": entry['bui'],
-                "closure": entry['closure'],
-                "biomass": entry['biomass'],
-                "slope": entry['slope'],
-                "fire_intensity_ratio": entry['fire_intensity_ratio'],
-                "pctgrowth_capped": entry['pctgrowth_capped'],
-                "day_frac": entry['day_frac'],
-                "firearea": entry['firearea'],
-                "fwi_prev1": entry['fwi_prev1'],
-                "fwi_prev2": entry['fwi_prev2'],
-                "rh_prev1": entry['rh_prev1'],
-                "rh_prev2": entry['rh_prev2'],
-                "prevGrowth": entry['prevGrowth']
-            }
-            processed_data_points.append(single_timestep_data)
-
-        input_df = pd.DataFrame(processed_data_points, columns=FEATURE_COLUMNS)
-
-        required_timesteps = 143
-        current_timesteps = len(input_df) 
-
-        if current_timesteps < required_timesteps:
-            padding_rows = required_timesteps - current_timesteps
-            padding_df = pd.DataFrame(0, index=range(padding_rows), columns=FEATURE_COLUMNS)
-            sequence_df = pd.concat([padding_df, input_df], ignore_index=True)
-        elif current_timesteps > required_timesteps:
-            
-            sequence_df = input_df.tail(required_timesteps)
-        else:
-            sequence_df = input_df
-        
-        normalized_sequence = normalize_input(sequence_df) 
-
-        normalized_input_reshaped = normalized_sequence.reshape(1, required_timesteps, len(FEATURE_COLUMNS))
-        
-        print(f"Shape of input to model: {normalized_input_reshaped.shape}")
-
-        classification_output = classification_model.predict(normalized_input_reshaped)
-
-        if classification_output[0][0] > classification_output[0][1]:
-            selected_model = cnn_lse_model
-        else:
-            selected_model = cnn_sfe_model
-        cnn_output = selected_model.predict(normalized_input_reshaped)
-
-        denormalized_output = denormalize_output(cnn_output)
+        with metrics.stage("json_parse"):
+            input_json = request.get_json(force=True)
+        log_payload(logger, "predict input", input_json)
+
+        normalized_input = build_sequence(input_json['data'])
+
+        cache_key = prediction_cache_key(normalized_input)
+        denormalized_output = load_cached_prediction(cache_key)
+        if denormalized_output is None:
+            # Includes the wait for the batcher to fill its window.
+            with metrics.stage("batched_inference"):
+                denormalized_output = predict_batcher(normalized_input)
+            store_cached_prediction(cache_key, denormalized_output)
 
         return jsonify({
             "status": "success",
@@ -125,14 +264,73 @@ def predict():
         })
 
     except Exception as e:
-        print("ERROR at runtime:")
-        import traceback
-        traceback.print_exc()
+        logger.exception("predict failed")
+
+        return jsonify({
+            "status": "error",
+            "message": str(e)
+        }), 500
+
+@app.route("/predict_batch", methods=["POST"])
+@model_loader.require_ready
+def predict_batch():
+    try:
+        with metrics.stage("json_parse"):
+            input_json = request.get_json(force=True)
+        sequences = input_json.get('sequences')
+
+        if not sequences or not isinstance(sequences, dict):
+            return jsonify({
+                "status": "error",
+                "message": "'sequences' must map location ids to timestep lists"
+            }), 400
+
+        keys = list(sequences.keys())
+        batch = np.empty((len(keys), REQUIRED_TIMESTEPS, len(FEATURE_COLUMNS)), dtype=np.float32)
+        for i, key in enumerate(keys):
+            build_sequence(sequences[key], out=batch[i])
+
+        log_payload(logger, "predict_batch input", input_json)
+
+        predictions = {}
+        pending = []
+        for i, key in enumerate(keys):
+            cache_key = prediction_cache_key(batch[i])
+            output = load_cached_prediction(cache_key)
+            if output is None:
+                pending.append((i, cache_key))
+            else:
+                predictions[key] = output
+
+        for start in range(0, len(pending), PREDICT_BATCH_MAX_SIZE):
+            chunk = pending[start:start + PREDICT_BATCH_MAX_SIZE]
+            outputs = run_inference_batch(batch[[i for i, _ in chunk]])
+            for (i, cache_key), output in zip(chunk, outputs):
+                store_cached_prediction(cache_key, output)
+                predictions[keys[i]] = output
+
+        return jsonify({
+            "status": "success",
+            "predictions": {key: predictions[key].tolist() for key in keys}
+        })
+
+    except Exception as e:
+        logger.exception("predict_batch failed")
 
         return jsonify({
             "status": "error",
             "message": str(e)
         }), 500
 
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    if prediction_cache is None:
+        return jsonify({"status": "success", "enabled": False})
+    return jsonify({"status": "success", "enabled": True, **prediction_cache.stats()})
+
+# Preforking servers set DEFER_MODEL_LOADING=1 and start the loader themselves.
+if os.environ.get("DEFER_MODEL_LOADING", "0") != "1":
+    model_loader.start()
+
 if __name__ == "__main__":
-    app.run(port=5002, debug=True)
\ No newline at end of file
+    app.run(port=5002, debug=os.environ.get("FLASK_DEBUG", "0") == "1")
\ No newline at end of file
@@ -0,0 +1,118 @@
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import jsonify
+
+logger = logging.getLogger(__name__)
+
+# Seconds a client should wait before retrying while models are loading.
+NOT_READY_RETRY_AFTER = 5
+
+
+class ModelLoader:
+    """Loads a service's models in parallel off the request path.
+
+    `loaders` maps a model name to a zero-argument callable that loads it.
+    They all run on their own threads; `warmup(models)` then runs once with
+    the loaded dict (push a dummy batch through each model, build anything
+    derived from them) before the loader reports ready. `setup` runs first,
+    e.g. to configure TensorFlow threads before any model touches the runtime.
+    """
+
+    def __init__(self, loaders, warmup=None, setup=None, name="model-loader"):
+        self.loaders = loaders
+        self.warmup = warmup
+        self.setup = setup
+        self.name = name
+        self.models = {}
+        self.error = None
+        self.load_seconds = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._done = threading.Event()
+
+    @property
+    def ready(self):
+        return self._done.is_set() and self.error is None
+
+    @property
+    def failed(self):
+        return self.error is not None
+
+    def start(self):
+        # Idempotent: later calls return while the first load is in flight.
+        with self._start_lock:
+            if self._thread is None and not self._done.is_set():
+                self._thread = threading.Thread(target=self._load, name=self.name, daemon=True)
+                self._thread.start()
+        return self
+
+    def load(self, timeout=None):
+        # Blocking variant, e.g. for a master that must finish before forking.
+        self.start()
+        self._done.wait(timeout)
+        if self.error is not None:
+            raise self.error
+        return self.models
+
+    def _load(self):
+        started = time.monotonic()
+        try:
+            if self.setup is not None:
+                self.setup()
+            with ThreadPoolExecutor(max_workers=len(self.loaders), thread_name_prefix=self.name) as executor:
+                futures = {name: executor.submit(loader) for name, loader in self.loaders.items()}
+                models = {name: future.result() for name, future in futures.items()}
+            if self.warmup is not None:
+                self.warmup(models)
+            self.models = models
+        except Exception as e:
+            logger.exception("%s: loading failed", self.name)
+            self.error = e
+        finally:
+            self.load_seconds = time.monotonic() - started
+            self._done.set()
+        if self.error is None:
+            logger.info("%s: %s ready in %.1fs", self.name, ", ".join(sorted(self.models)), self.load_seconds)
+
+    def status(self):
+        if self.error is not None:
+            return {"status": "error", "message": f"Model loading failed: {self.error}"}
+        if not self._done.is_set():
+            return {"status": "loading"}
+        return {"status": "ready", "models": sorted(self.models), "loadSeconds": round(self.load_seconds, 2)}
+
+    def not_ready_response(self):
+        status = self.status()
+        status.setdefault("message", "Models are still loading")
+        response = jsonify(status)
+        response.status_code = 503
+        response.headers["Retry-After"] = str(NOT_READY_RETRY_AFTER)
+        return response
+
+    def require_ready(self, view):
+        # Route decorator: 503 with Retry-After until the models are warmed up.
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if not self.ready:
+                return self.not_ready_response()
+            return view(*args, **kwargs)
+        return wrapper
+
+    def register_health_routes(self, app):
+        # /healthz: the process is serving (fails only if loading failed for
+        # good, so it gets restarted). /readyz: models loaded and warmed.
+        @app.route("/healthz", methods=["GET"])
+        def healthz():
+            if self.failed:
+                return jsonify(self.status()), 500
+            return jsonify({"status": "ok"})
+
+        @app.route("/readyz", methods=["GET"])
+        def readyz():
+            if not self.ready:
+                return self.not_ready_response()
+            return jsonify(self.status())
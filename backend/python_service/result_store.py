@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# A prune of the spill directory keeps this fraction of spill_max_items.
+SPILL_PRUNE_RATIO = 0.9
+
+
+class ResultStore:
+    """Bounded in-memory bytes store with TTL and LRU eviction.
+
+    Entries are evicted least-recently-used first once `max_items` or
+    `max_bytes` is exceeded, and are dropped on access after `ttl_seconds`.
+    With `spill_dir` set, entries evicted for capacity are written there
+    instead of being discarded and are read back (and promoted) on the next
+    hit; the disk tier is pruned oldest-first once it holds more than
+    `spill_max_items` files. The file count is tracked in memory, so the
+    directory is only scanned when a prune is due, and each prune goes down
+    to SPILL_PRUNE_RATIO of the limit so scans stay rare.
+    With `write_through` every put is also written to `spill_dir` and files
+    are kept after being read, so the disk tier outlives the process.
+    `hits` and `misses` count lookups across both tiers.
+    """
+
+    def __init__(self, max_items=256, max_bytes=64 * 1024 * 1024, ttl_seconds=3600,
+                 spill_dir=None, spill_max_items=4096, write_through=False):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_dir = spill_dir
+        self.spill_max_items = spill_max_items
+        self.write_through = bool(spill_dir and write_through)
+        self._entries = OrderedDict()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._spill_count = 0
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_count = len(self._spill_files())
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size_bytes(self):
+        return self._size
+
+    def stats(self):
+        return {
+            "items": len(self._entries),
+            "bytes": self._size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+    def put(self, key, value):
+        self._insert(key, value)
+        if self.write_through:
+            self._spill(key, value, self.ttl_seconds)
+
+    def touch(self, key):
+        """Give a fresh entry a full TTL again without rewriting it.
+
+        Returns False when there is no unexpired copy (or, with write_through,
+        its file is gone), in which case the caller should put() it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            in_memory = entry is not None and entry[1] > now
+            if in_memory:
+                self._entries[key] = (entry[0], now + self.ttl_seconds)
+                self._entries.move_to_end(key)
+        if not self.spill_dir or (in_memory and not self.write_through):
+            return in_memory
+        path = self._spill_path(key)
+        try:
+            if os.path.getmtime(path) <= time.time():
+                return False
+            expires_at = time.time() + self.ttl_seconds
+            os.utime(path, (expires_at, expires_at))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+        value = self._load_spilled(key)
+        if value is not None:
+            self._insert(key, value)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def _insert(self, key, value):
+        now = time.monotonic()
+        spilled = []
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (value, now + self.ttl_seconds)
+            self._size += len(value)
+            while self._entries and (len(self._entries) > self.max_items or self._size > self.max_bytes):
+                old_key, (old_value, expires_at) = self._entries.popitem(last=False)
+                self._size -= len(old_value)
+                # Write-through entries are already on disk.
+                if expires_at > now and not self.write_through:
+                    spilled.append((old_key, old_value, expires_at - now))
+        for old_key, old_value, remaining in spilled:
+            self._spill(old_key, old_value, remaining)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry[0])
+
+    def _spill_path(self, key):
+        return os.path.join(self.spill_dir, os.path.basename(key))
+
+    def _spill(self, key, value, remaining_ttl):
+        if not self.spill_dir:
+            return
+        path = self._spill_path(key)
+        is_new = not os.path.exists(path)
+        tmp_path = f"{path}.tmp{threading.get_ident()}"
+        with open(tmp_path, "wb") as f:
+            f.write(value)
+        os.replace(tmp_path, path)
+        # The file's mtime records when the entry expires.
+        expires_at = time.time() + remaining_ttl
+        os.utime(path, (expires_at, expires_at))
+        if is_new:
+            with self._lock:
+                self._spill_count += 1
+                prune = self._spill_count > self.spill_max_items
+            if prune:
+                self._prune_spill_dir()
+
+    def _load_spilled(self, key):
+        if not self.spill_dir:
+            return None
+        path = self._spill_path(key)
+        try:
+            if os.path.getmtime(path) <= time.time():
+                self._remove_spilled(path)
+                return None
+            with open(path, "rb") as f:
+                value = f.read()
+            if not self.write_through:
+                self._remove_spilled(path)
+            return value
+        except FileNotFoundError:
+            return None
+
+    def _remove_spilled(self, path):
+        os.remove(path)
+        with self._lock:
+            self._spill_count -= 1
+
+    def _spill_files(self):
+        return [entry for entry in os.scandir(self.spill_dir) if entry.is_file()]
+
+    def _prune_spill_dir(self):
+        # Recounts from disk too, which also picks up files other processes
+        # sharing the directory have written or removed.
+        entries = self._spill_files()
+        keep = int(self.spill_max_items * SPILL_PRUNE_RATIO)
+        removed = 0
+        if len(entries) > keep:
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - keep]:
+                try:
+                    os.remove(entry.path)
+                    removed += 1
+                except FileNotFoundError:
+                    pass
+        with self._lock:
+            self._spill_count = len(entries) - removed
@@ -0,0 +1,158 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, has_request_context, request
+
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+# "json" (one object per line) or "text".
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+# Records waiting for the writer thread; beyond this they are dropped rather
+# than blocking a request on a slow stdout pipe.
+LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+# Fraction of requests whose input payload is logged, and its cut-off length.
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get("LOG_PAYLOAD_SAMPLE_RATE", 0.01))
+LOG_PAYLOAD_MAX_CHARS = int(os.environ.get("LOG_PAYLOAD_MAX_CHARS", 2048))
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Attributes every LogRecord has; anything else came in through `extra=`.
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": record.request_id,
+        }
+        entry.update(_extra_fields(record))
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s")
+
+    def formatMessage(self, record):
+        fields = " ".join(f"{key}={value}" for key, value in _extra_fields(record).items())
+        message = super().formatMessage(record)
+        return f"{message} {fields}" if fields else message
+
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record):
+        # Handler filters run on the calling thread, before the record is
+        # queued, so flask.g still belongs to the request that logged it.
+        if not hasattr(record, "request_id"):
+            record.request_id = g.get("request_id") if has_request_context() else None
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records when the queue is full.
+
+    Only the message and traceback are rendered on the calling thread;
+    formatting and the stdout write happen on the listener thread.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+_handler = None
+_listener = None
+
+
+def _start_listener():
+    global _listener
+    # After fork() the old queue's lock may be held and its thread is gone.
+    _handler.queue = queue.Queue(LOG_QUEUE_SIZE)
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if LOG_FORMAT == "json" else TextFormatter())
+    _listener = QueueListener(_handler.queue, output)
+    _listener.start()
+
+
+def configure_logging():
+    # Idempotent: both services call it on import.
+    global _handler
+    if _handler is not None:
+        return
+    _handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _handler.addFilter(RequestIdFilter())
+    root = logging.getLogger()
+    root.setLevel(LOG_LEVEL)
+    root.addHandler(_handler)
+    _start_listener()
+    os.register_at_fork(after_in_child=_start_listener)
+    # Write out whatever is still queued when the process exits.
+    atexit.register(lambda: _listener.stop())
+
+
+def log_payload(logger, message, payload):
+    # Logs a sampled, truncated JSON rendering of a request payload.
+    if LOG_PAYLOAD_SAMPLE_RATE <= 0 or random.random() >= LOG_PAYLOAD_SAMPLE_RATE:
+        return
+    if not logger.isEnabledFor(logging.INFO):
+        return
+    text = json.dumps(payload, default=str)
+    extra = {"payload_chars": len(text)}
+    if len(text) > LOG_PAYLOAD_MAX_CHARS:
+        text = text[:LOG_PAYLOAD_MAX_CHARS]
+        extra["truncated"] = True
+    extra["payload"] = text
+    logger.info(message, extra=extra)
+
+
+def register_request_logging(app, logger):
+    # Assigns each request an id (the caller's X-Request-ID if sent), returns
+    # it in the response and logs one access line per request.
+    @app.before_request
+    def start_request():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    def finish_request(response):
+        if "request_id" not in g:
+            return response
+        response.headers[REQUEST_ID_HEADER] = g.request_id
+        logger.info("request", extra={
+            "method": request.method,
+            "path": request.path,
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - g.request_started) * 1000, 2),
+        })
+        return response
@@ -0,0 +1,103 @@
+import os
+import time
+
+from flask import Response, g, request
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+
+# Sub-millisecond stages (scaling, the gate on a warm model) up to slow
+# downloads and cold batches.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by endpoint",
+    ["service", "endpoint", "method", "status"], buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled",
+    ["service", "endpoint"], multiprocess_mode="livesum",
+)
+STAGE_LATENCY = Histogram(
+    "inference_stage_duration_seconds", "Time spent in each step of the inference path",
+    ["service", "stage"], buckets=LATENCY_BUCKETS,
+)
+MODEL_INFERENCES = Counter(
+    "model_inferences_total", "Samples run through each model", ["service", "model"],
+)
+MODEL_BATCH_SIZE = Histogram(
+    "model_batch_size", "Samples per model call", ["service", "model"], buckets=BATCH_SIZE_BUCKETS,
+)
+
+
+class ServiceMetrics:
+    """Prometheus metrics for one Flask service.
+
+    `stage(name)` times a block into inference_stage_duration_seconds,
+    `record_inference(model, n)` counts a model call of n samples, and
+    `register(app)` adds per-endpoint latency / in-flight tracking and
+    GET /metrics. Under gunicorn, PROMETHEUS_MULTIPROC_DIR (set by
+    gunicorn_conf.py) makes /metrics aggregate every worker.
+    """
+
+    def __init__(self, service):
+        self.service = service
+        self._stages = {}
+        self._models = {}
+
+    def stage(self, name):
+        timer = self._stages.get(name)
+        if timer is None:
+            timer = self._stages[name] = STAGE_LATENCY.labels(self.service, name)
+        return timer.time()
+
+    def record_inference(self, model, batch_size):
+        children = self._models.get(model)
+        if children is None:
+            children = self._models[model] = (
+                MODEL_INFERENCES.labels(self.service, model),
+                MODEL_BATCH_SIZE.labels(self.service, model),
+            )
+        children[0].inc(batch_size)
+        children[1].observe(batch_size)
+
+    def register(self, app):
+        @app.before_request
+        def start_request():
+            # The route pattern, not the path, so /cam/<filename> is one series.
+            g.metrics_endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+            g.metrics_started = time.perf_counter()
+            REQUESTS_IN_FLIGHT.labels(self.service, g.metrics_endpoint).inc()
+
+        @app.after_request
+        def observe_request(response):
+            if "metrics_started" in g:
+                REQUEST_LATENCY.labels(
+                    self.service, g.metrics_endpoint, request.method, str(response.status_code)
+                ).observe(time.perf_counter() - g.metrics_started)
+            return response
+
+        @app.teardown_request
+        def finish_request(exc):
+            if "metrics_endpoint" in g:
+                REQUESTS_IN_FLIGHT.labels(self.service, g.metrics_endpoint).dec()
+
+        @app.route("/metrics", methods=["GET"])
+        def metrics():
+            return Response(metrics_payload(), content_type=CONTENT_TYPE_LATEST)
+
+
+def metrics_payload():
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest(REGISTRY)
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry)
@@ -0,0 +1,70 @@
+import cv2
+import numpy as np
+import pytest
+
+from cam_render import fit_to_size, generate_cam
+
+LUT = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cv2.COLORMAP_PLASMA).reshape(256, 3)
+
+
+def reference_generate_cam(original_img, conv_output, pred_class, lut):
+    # The full-frame blend generate_cam replaced.
+    weights = np.mean(conv_output[0], axis=-1)
+    weights = np.maximum(weights, 0)
+    weights /= np.max(weights)
+
+    heatmap = lut[np.uint8(255 * weights)]
+    original_img_bgr = cv2.cvtColor(original_img, cv2.COLOR_RGB2BGR)
+    heatmap = cv2.resize(heatmap, (original_img_bgr.shape[1], original_img_bgr.shape[0]))
+    cam_img = cv2.addWeighted(original_img_bgr, 0.7, heatmap, 0.3, 0)
+
+    if pred_class == 1:
+        fire_mask = (weights > 0.5).astype(np.uint8)
+        fire_mask = cv2.resize(fire_mask, (original_img_bgr.shape[1], original_img_bgr.shape[0]))
+
+        enhanced_heatmap = cv2.addWeighted(original_img_bgr, 0.6, heatmap, 0.4, 0)
+        cam_img[fire_mask == 1] = enhanced_heatmap[fire_mask == 1]
+
+    return cam_img
+
+
+def make_case(seed, height, width):
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+    conv_output = rng.standard_normal((1, 7, 7, 64)).astype(np.float32)
+    return image, conv_output
+
+
+@pytest.mark.parametrize("pred_class", [0, 1])
+@pytest.mark.parametrize("height, width", [(224, 224), (300, 451), (17, 9)])
+@pytest.mark.parametrize("seed", range(4))
+def test_matches_reference(seed, height, width, pred_class):
+    image, conv_output = make_case(seed, height, width)
+    expected = reference_generate_cam(image, conv_output, pred_class, LUT)
+    np.testing.assert_array_equal(generate_cam(image, conv_output, pred_class, LUT), expected)
+
+
+@pytest.mark.parametrize("pred_class", [0, 1])
+def test_max_size_matches_reference_on_downscaled_image(pred_class):
+    image, conv_output = make_case(7, 900, 1200)
+    expected = reference_generate_cam(fit_to_size(image, 512), conv_output, pred_class, LUT)
+    actual = generate_cam(image, conv_output, pred_class, LUT, max_size=512)
+    assert actual.shape == (384, 512, 3)
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_fire_mask_covering_whole_frame():
+    image, _ = make_case(3, 64, 64)
+    conv_output = np.ones((1, 7, 7, 64), dtype=np.float32)
+    expected = reference_generate_cam(image, conv_output, 1, LUT)
+    np.testing.assert_array_equal(generate_cam(image, conv_output, 1, LUT), expected)
+
+
+def test_all_negative_activations_render_without_nan():
+    # The reference divides by a zero peak here; generate_cam blends the
+    # bottom colour of the map everywhere.
+    image, _ = make_case(5, 32, 32)
+    conv_output = -np.ones((1, 7, 7, 64), dtype=np.float32)
+    heatmap = np.broadcast_to(LUT[0], image.shape).copy()
+    expected = cv2.addWeighted(cv2.cvtColor(image, cv2.COLOR_RGB2BGR), 0.7, heatmap, 0.3, 0)
+    np.testing.assert_array_equal(generate_cam(image, conv_output, 1, LUT), expected)
@@ -0,0 +1,69 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from image_fetch import ImageFetcher, ImageFetchError
+
+BODY = bytes(range(256)) * 1024
+
+
+class Handler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        try:
+            if self.path == "/drip":
+                # One byte at a time, each well inside the read timeout.
+                for i in range(len(BODY)):
+                    self.wfile.write(BODY[i:i + 1])
+                    self.wfile.flush()
+                    time.sleep(0.05)
+            else:
+                self.wfile.write(BODY)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def origin():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def test_fetch_returns_body(origin):
+    assert ImageFetcher().fetch(origin + "/image") == BODY
+
+
+def test_fetch_rejects_large_body(origin):
+    with pytest.raises(ImageFetchError) as error:
+        ImageFetcher(max_bytes=len(BODY) - 1).fetch(origin + "/image")
+    assert error.value.status_code == 413
+
+
+def test_slow_drip_hits_total_timeout(origin):
+    fetcher = ImageFetcher(read_timeout=1.0, total_timeout=0.5, retries=0)
+    started = time.monotonic()
+    with pytest.raises(ImageFetchError) as error:
+        fetcher.fetch(origin + "/drip")
+    assert error.value.status_code == 504
+    assert time.monotonic() - started < 2.0
+
+
+def test_slow_drip_frees_fetch_threads(origin):
+    fetcher = ImageFetcher(read_timeout=1.0, total_timeout=0.5, retries=0, workers=2)
+    slow = [fetcher.executor.submit(fetcher.fetch, origin + "/drip") for _ in range(2)]
+    # Only starts once one of the slow downloads has given up its thread.
+    fast = fetcher.executor.submit(fetcher.fetch, origin + "/image")
+    assert fast.result(timeout=5) == BODY
+    for future in slow:
+        with pytest.raises(ImageFetchError):
+            future.result(timeout=5)
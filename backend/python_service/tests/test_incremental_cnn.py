@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from incremental_cnn import IncrementalCNN, UnsupportedModelError  # noqa: E402
+
+INPUT_SHAPE = (40, 6)
+layers = tf.keras.layers
+
+
+def build(seed, *hidden):
+    tf.keras.utils.set_random_seed(seed)
+    return tf.keras.Sequential([layers.Input(INPUT_SHAPE), *hidden])
+
+
+MODELS = {
+    "same": lambda: build(
+        0,
+        layers.Conv1D(8, 3, padding="same", activation="relu"),
+        layers.Conv1D(8, 5, padding="same", activation="tanh"),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(1),
+    ),
+    "causal_dilated": lambda: build(
+        1,
+        layers.Conv1D(8, 3, padding="causal", dilation_rate=2, activation="relu"),
+        layers.Conv1D(8, 3, padding="causal", dilation_rate=4, activation="relu"),
+        layers.GlobalMaxPooling1D(),
+        layers.Dense(2, activation="softmax"),
+    ),
+    "strided_pooled": lambda: build(
+        2,
+        layers.Conv1D(8, 3, activation="relu"),
+        layers.MaxPooling1D(2),
+        layers.Conv1D(8, 3, strides=2, activation="relu"),
+        layers.AveragePooling1D(2),
+        layers.Flatten(),
+        layers.Dense(4, activation="relu"),
+        layers.Dense(1),
+    ),
+    "batch_norm": lambda: build(
+        3,
+        layers.Conv1D(8, 3, padding="same"),
+        layers.BatchNormalization(),
+        layers.Activation("relu"),
+        layers.Dropout(0.5),
+        layers.Dense(4, activation="elu"),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(1, activation="sigmoid"),
+    ),
+}
+
+
+@pytest.fixture(scope="module", params=sorted(MODELS))
+def model(request):
+    keras_model = MODELS[request.param]()
+    return keras_model, IncrementalCNN(keras_model)
+
+
+def windows(seed, days=12):
+    # Day-by-day windows of one track: each is the previous moved on by a row.
+    rows = np.random.default_rng(seed).standard_normal((INPUT_SHAPE[0] + days, INPUT_SHAPE[1]))
+    return np.stack([rows[day:day + INPUT_SHAPE[0]] for day in range(days)]).astype(np.float32)
+
+
+def test_predict_matches_keras(model):
+    keras_model, engine = model
+    batch = np.random.default_rng(1).standard_normal((5,) + INPUT_SHAPE).astype(np.float32)
+    np.testing.assert_allclose(engine.predict(batch), keras_model(batch, training=False), rtol=1e-5, atol=1e-5)
+
+
+def test_sliding_forward_is_bit_identical(model):
+    _, engine = model
+    replay = windows(2)
+    _, previous = engine.forward(replay[:1])
+    for day in range(1, len(replay)):
+        window = replay[day:day + 1]
+        full, full_activations = engine.forward(window)
+        sliding, previous = engine.forward(window, previous)
+        np.testing.assert_array_equal(sliding, full)
+        for expected, actual in zip(full_activations, previous):
+            np.testing.assert_array_equal(actual, expected)
+
+
+def test_multi_day_shift_is_bit_identical(model):
+    _, engine = model
+    replay = windows(3)
+    _, previous = engine.forward(replay[:1])
+    full, _ = engine.forward(replay[4:5])
+    sliding, _ = engine.forward(replay[4:5], previous, shift=4)
+    np.testing.assert_array_equal(sliding, full)
+
+
+def test_activations_round_trip_through_pack(model):
+    _, engine = model
+    replay = windows(4, days=3)
+    _, activations = engine.forward(replay)
+    stacked = engine.stack([engine.unpack(engine.pack(activations, i)) for i in range(len(replay))])
+    for expected, actual in zip(activations, stacked):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_padding_prefix_is_bit_identical(model):
+    _, engine = model
+    padding_row = np.random.default_rng(5).standard_normal(INPUT_SHAPE[1]).astype(np.float32)
+    batch = np.random.default_rng(6).standard_normal((3,) + INPUT_SHAPE).astype(np.float32)
+    batch[:, :INPUT_SHAPE[0] - 7] = padding_row
+    expected, _ = engine.forward(batch)
+    engine.set_padding_row(padding_row)
+    try:
+        actual, _ = engine.forward(batch)
+    finally:
+        engine.padding_row = engine.padding_activations = None
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_recurrent_model_is_unsupported():
+    keras_model = build(7, layers.LSTM(4), layers.Dense(1))
+    with pytest.raises(UnsupportedModelError):
+        IncrementalCNN(keras_model)
+
+
+def test_skip_connection_is_unsupported():
+    tf.keras.utils.set_random_seed(8)
+    inputs = layers.Input(INPUT_SHAPE)
+    hidden = layers.Conv1D(INPUT_SHAPE[1], 3, padding="same", activation="relu")(inputs)
+    hidden = layers.Add()([inputs, hidden])
+    outputs = layers.Dense(1)(layers.GlobalAveragePooling1D()(hidden))
+    with pytest.raises(UnsupportedModelError):
+        IncrementalCNN(tf.keras.Model(inputs, outputs))
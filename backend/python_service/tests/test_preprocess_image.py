@@ -0,0 +1,30 @@
+import io
+
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("tensorflow")
+
+import image_server  # noqa: E402
+
+
+def encode(size, fmt):
+    rng = np.random.default_rng(0)
+    # Smooth gradients plus noise, so DCT scaling actually changes the pixels.
+    y, x = np.mgrid[:size[1], :size[0]]
+    pixels = np.stack([x * 255 // size[0], y * 255 // size[1], (x + y) % 256], axis=-1)
+    pixels = np.clip(pixels + rng.integers(-20, 20, pixels.shape), 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("size, fmt", [((3000, 2000), "JPEG"), ((612, 408), "JPEG"), ((900, 700), "PNG")])
+def test_model_input_does_not_depend_on_cam_size(size, fmt):
+    data = encode(size, fmt)
+    expected, _ = image_server.preprocess_image(data)
+    for max_size in (224, 600, 1500, 4000):
+        actual, overlay = image_server.preprocess_image(data, max_size=max_size)
+        np.testing.assert_array_equal(actual, expected)
+        assert max(overlay.shape[:2]) >= min(max_size, max(size))
@@ -0,0 +1,45 @@
+import os
+import time
+
+from result_store import ResultStore
+
+
+def test_touch_without_entry_is_false():
+    assert not ResultStore().touch("missing")
+
+
+def test_touch_extends_memory_entry():
+    store = ResultStore(ttl_seconds=0.2)
+    store.put("key", b"value")
+    time.sleep(0.15)
+    assert store.touch("key")
+    time.sleep(0.15)
+    assert store.get("key") == b"value"
+
+
+def test_touch_does_not_rewrite_spill_file(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path), write_through=True, ttl_seconds=60)
+    store.put("key", b"value")
+    path = tmp_path / "key"
+    inode = path.stat().st_ino
+    os.utime(path, (time.time() + 1, time.time() + 1))
+    assert store.touch("key")
+    assert path.stat().st_ino == inode
+    assert path.stat().st_mtime > time.time() + 30
+
+
+def test_touch_sees_entries_written_by_another_store(tmp_path):
+    ResultStore(spill_dir=str(tmp_path), write_through=True).put("key", b"value")
+    assert ResultStore(spill_dir=str(tmp_path), write_through=True).touch("key")
+
+
+def test_touch_fails_when_spill_file_is_gone_or_expired(tmp_path):
+    store = ResultStore(spill_dir=str(tmp_path), write_through=True)
+    store.put("gone", b"value")
+    os.remove(tmp_path / "gone")
+    assert not store.touch("gone")
+
+    other = ResultStore(spill_dir=str(tmp_path), write_through=True)
+    store.put("expired", b"value")
+    os.utime(tmp_path / "expired", (time.time() - 1, time.time() - 1))
+    assert not other.touch("expired")
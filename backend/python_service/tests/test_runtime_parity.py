@@ -0,0 +1,79 @@
+import os
+
+import numpy as np
+import pytest
+
+tf = pytest.importorskip("tensorflow")
+
+from export_models import export_tflite  # noqa: E402
+from timestep_features import FEATURE_COLUMNS, REQUIRED_TIMESTEPS  # noqa: E402
+from timestep_models import (  # noqa: E402
+    TIMESTEP_MODEL_FILES,
+    KerasTimestepModel,
+    TFLiteTimestepModel,
+    build_fused_function,
+    tflite_path,
+)
+
+ATOL = 1e-4
+INPUT_SHAPE = (REQUIRED_TIMESTEPS, len(FEATURE_COLUMNS))
+
+
+def small_model(seed, outputs, activation=None):
+    tf.keras.utils.set_random_seed(seed)
+    layers = tf.keras.layers
+    return tf.keras.Sequential([
+        layers.Input(INPUT_SHAPE),
+        layers.Conv1D(8, 3, activation="relu"),
+        layers.MaxPooling1D(2),
+        layers.Conv1D(8, 3, activation="relu"),
+        layers.GlobalAveragePooling1D(),
+        layers.Dense(outputs, activation=activation),
+    ])
+
+
+def batches():
+    rng = np.random.default_rng(0)
+    # Size changes exercise the interpreter's input resize.
+    return [rng.standard_normal((n,) + INPUT_SHAPE).astype(np.float32) for n in (1, 5, 1, 3)]
+
+
+@pytest.fixture(scope="module")
+def exported_model(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("models")
+    model_file = str(directory / "regressor.h5")
+    small_model(0, 1).save(model_file)
+    export_tflite(model_file, tflite_path(model_file))
+    return model_file
+
+
+def test_tflite_matches_keras(exported_model):
+    keras_model = KerasTimestepModel(exported_model)
+    tflite_model = TFLiteTimestepModel(tflite_path(exported_model))
+    for batch in batches():
+        np.testing.assert_allclose(tflite_model.predict(batch), keras_model.predict(batch), atol=ATOL)
+
+
+def test_fused_pipeline_matches_routed_models():
+    models = {
+        "classification": small_model(1, 2, activation="softmax"),
+        "cnn_lse": small_model(2, 1),
+        "cnn_sfe": small_model(3, 1),
+    }
+    fused = build_fused_function(models)
+    for batch in batches():
+        classification = models["classification"](batch).numpy()
+        use_lse = classification[:, :1] > classification[:, 1:]
+        expected = np.where(use_lse, models["cnn_lse"](batch).numpy(), models["cnn_sfe"](batch).numpy())
+        np.testing.assert_allclose(fused(batch).numpy(), expected, atol=1e-6)
+
+
+@pytest.mark.parametrize("name", sorted(TIMESTEP_MODEL_FILES))
+def test_exported_service_models_match_keras(name):
+    model_file = TIMESTEP_MODEL_FILES[name]
+    if not (os.path.exists(model_file) and os.path.exists(tflite_path(model_file))):
+        pytest.skip(f"{name}: weights or export_models.py output not present")
+    keras_model = KerasTimestepModel(model_file)
+    tflite_model = TFLiteTimestepModel(tflite_path(model_file))
+    for batch in batches():
+        np.testing.assert_allclose(tflite_model.predict(batch), keras_model.predict(batch), atol=ATOL)
@@ -0,0 +1,95 @@
+import json
+from operator import itemgetter
+
+import numpy as np
+
+FEATURE_COLUMNS = [
+    "tmax", "rh", "ws", "vpd", "fwi", "isi", "bui", "closure",
+    "biomass", "slope", "fire_intensity_ratio", "pctgrowth_capped",
+    "day_frac", "firearea", "fwi_prev1", "fwi_prev2", "rh_prev1", "rh_prev2",
+    "prevGrowth"
+]
+assert len(FEATURE_COLUMNS) == 19, "FEATURE_COLUMNS list must have 19 features as per model's expected input."
+REQUIRED_TIMESTEPS = 143
+
+_feature_values = itemgetter(*FEATURE_COLUMNS)
+
+
+def fill_sequence(entries, out=None):
+    """Write JSON timestep entries into a (143, 19) float32 array.
+
+    Short histories are left-padded with zero rows and long ones keep the
+    most recent REQUIRED_TIMESTEPS entries, matching the model's training
+    layout. `out` may be a preallocated array (e.g. one row of a batch).
+    """
+    if out is None:
+        out = np.empty((REQUIRED_TIMESTEPS, len(FEATURE_COLUMNS)), dtype=np.float32)
+
+    entries = entries[-REQUIRED_TIMESTEPS:]
+    offset = REQUIRED_TIMESTEPS - len(entries)
+    out[:offset] = 0
+    for row, entry in enumerate(entries, start=offset):
+        out[row] = _feature_values(entry)
+    return out
+
+
+class FeatureScaling:
+    """Per-feature min-max normalisation fitted on the training data.
+
+    Same parameters as sklearn's MinMaxScaler(feature_range=(0, 1)):
+    transform is `x * scale + min` and the inverse `(y - min) / scale`. Both
+    run in place on float32 arrays. Model outputs are in the normalised units
+    of `target`, so the inverse only needs that column's pair.
+    """
+
+    def __init__(self, minimum, scale, target=FEATURE_COLUMNS[0]):
+        self.min = np.asarray(minimum, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+        self.target = target
+        column = FEATURE_COLUMNS.index(target)
+        self.target_min = self.min[column]
+        self.target_scale = self.scale[column]
+
+    @classmethod
+    def identity(cls):
+        return cls(np.zeros(len(FEATURE_COLUMNS)), np.ones(len(FEATURE_COLUMNS)))
+
+    @classmethod
+    def fit(cls, rows, target=FEATURE_COLUMNS[0]):
+        # rows: (n, 19) training feature values in FEATURE_COLUMNS order.
+        rows = np.asarray(rows, dtype=np.float64)
+        data_min = np.nanmin(rows, axis=0)
+        data_range = np.nanmax(rows, axis=0) - data_min
+        # Constant features keep scale 1, as MinMaxScaler does.
+        scale = 1.0 / np.where(data_range == 0, 1.0, data_range)
+        return cls(-data_min * scale, scale, target)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            params = json.load(f)
+        if params["columns"] != FEATURE_COLUMNS:
+            raise ValueError(f"{path}: fitted on columns {params['columns']}, expected {FEATURE_COLUMNS}")
+        return cls(params["min"], params["scale"], params["target"])
+
+    def save(self, path):
+        params = {
+            "columns": FEATURE_COLUMNS,
+            "min": self.min.tolist(),
+            "scale": self.scale.tolist(),
+            "target": self.target,
+        }
+        with open(path, "w") as f:
+            json.dump(params, f, indent=2)
+
+    def transform(self, sequence):
+        # (..., 19) float32, e.g. a fill_sequence() buffer.
+        sequence *= self.scale
+        sequence += self.min
+        return sequence
+
+    def inverse_target(self, outputs):
+        # float32 model outputs in normalised target units.
+        outputs -= self.target_min
+        outputs /= self.target_scale
+        return outputs
@@ -0,0 +1,183 @@
+import hashlib
+import os
+import threading
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.environ.get("WILDFIRE_MODEL_DIR", os.path.join(BASE_DIR, "../wildfireModel"))
+
+classification_model_path = "classification_cnn_model_new1.h5"
+cnn_lse_model_path = "cnn_lse_reg.h5"
+cnn_sfe_model_path = "cnn_sfe_reg.h5"
+
+TIMESTEP_MODEL_FILES = {
+    "classification": os.path.join(MODEL_DIR, classification_model_path),
+    "cnn_lse": os.path.join(MODEL_DIR, cnn_lse_model_path),
+    "cnn_sfe": os.path.join(MODEL_DIR, cnn_sfe_model_path),
+}
+
+FUSED_PIPELINE_FILE = os.path.join(MODEL_DIR, "timestep_pipeline_fused.tflite")
+# Feature min/scale written by fit_normalization.py. Without it inputs are
+# passed through unscaled.
+NORMALIZATION_FILE = os.environ.get("NORMALIZATION_FILE", os.path.join(MODEL_DIR, "timestep_normalization.json"))
+
+MODEL_RUNTIMES = ("keras", "tflite")
+
+
+def tflite_path(model_file):
+    return os.path.splitext(model_file)[0] + ".tflite"
+
+
+def model_files(runtime="keras", fused=False):
+    files = list(TIMESTEP_MODEL_FILES.values())
+    if runtime == "tflite":
+        files = [tflite_path(model_file) for model_file in files]
+        if fused:
+            files.append(FUSED_PIPELINE_FILE)
+    return files
+
+
+def model_version(runtime="keras", fused=False):
+    # Digest of the runtime name and every weight file it loads (and the
+    # normalisation), so anything keyed on it is invalidated when a model is
+    # retrained, re-exported or refitted.
+    digest = hashlib.sha256(runtime.encode())
+    files = model_files(runtime, fused)
+    if os.path.exists(NORMALIZATION_FILE):
+        files.append(NORMALIZATION_FILE)
+    for model_file in files:
+        with open(model_file, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def load_keras_model(model_file):
+    import tensorflow as tf
+    from tensorflow.keras.models import load_model
+
+    def mse(y_true, y_pred):
+        return tf.reduce_mean(tf.square(y_true - y_pred))
+
+    return load_model(model_file, custom_objects={'mse': mse})
+
+
+class KerasTimestepModel:
+    def __init__(self, model_file):
+        from compiled_model import CompiledModel
+
+        self.model = load_keras_model(model_file)
+        self.compiled = CompiledModel(self.model)
+
+    def predict(self, batch):
+        return self.compiled.predict(batch)
+
+
+class TFLiteTimestepModel:
+    """Runs an exported .tflite model without importing full TensorFlow.
+
+    Uses the standalone tflite_runtime package when installed and falls back
+    to tf.lite otherwise. The interpreter is not thread-safe, so calls are
+    serialised and the input tensor is only resized when the batch size changes.
+    """
+
+    def __init__(self, model_file, num_threads=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            import tensorflow as tf
+            Interpreter = tf.lite.Interpreter
+
+        self.interpreter = Interpreter(model_path=model_file, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        input_details = self.interpreter.get_input_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = self.interpreter.get_output_details()[0]['index']
+        self._batch_size = int(input_details['shape'][0])
+        self._lock = threading.Lock()
+
+    def predict(self, batch):
+        batch = np.ascontiguousarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input_index, batch.shape)
+                self.interpreter.allocate_tensors()
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self._input_index, batch)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output_index).copy()
+
+
+def load_timestep_model(name, runtime="keras", num_threads=None):
+    if runtime not in MODEL_RUNTIMES:
+        raise ValueError(f"Unknown model runtime '{runtime}', expected one of {MODEL_RUNTIMES}")
+
+    model_file = TIMESTEP_MODEL_FILES[name]
+    if runtime == "tflite":
+        exported_file = tflite_path(model_file)
+        if not os.path.exists(exported_file):
+            raise FileNotFoundError(
+                f"{exported_file} not found, run export_models.py to create it"
+            )
+        return TFLiteTimestepModel(exported_file, num_threads=num_threads)
+    return KerasTimestepModel(model_file)
+
+
+def load_timestep_models(runtime="keras", num_threads=None):
+    return {
+        name: load_timestep_model(name, runtime, num_threads)
+        for name in TIMESTEP_MODEL_FILES
+    }
+
+
+def build_fused_function(keras_models, jit_compile=False):
+    """Trace classifier + both regressors into one graph with in-graph routing.
+
+    Both regressors run on the whole batch and tf.where picks the LSE output
+    where the classifier favours class 0, so a single call returns the final
+    scaled prediction with no Python branch in between.
+    """
+    import tensorflow as tf
+
+    classification_model = keras_models["classification"]
+    cnn_lse_model = keras_models["cnn_lse"]
+    cnn_sfe_model = keras_models["cnn_sfe"]
+    input_shape = classification_model.input_shape[1:]
+
+    @tf.function(
+        input_signature=[tf.TensorSpec((None,) + tuple(input_shape), tf.float32)],
+        jit_compile=jit_compile,
+    )
+    def fused_pipeline(batch):
+        classification_output = classification_model(batch, training=False)
+        use_lse = classification_output[:, 0:1] > classification_output[:, 1:2]
+        return tf.where(
+            use_lse,
+            cnn_lse_model(batch, training=False),
+            cnn_sfe_model(batch, training=False),
+        )
+
+    return fused_pipeline
+
+
+class FusedKerasPipeline:
+    def __init__(self, keras_models, jit_compile=None):
+        from compiled_model import INFERENCE_JIT
+
+        if jit_compile is None:
+            jit_compile = INFERENCE_JIT
+        self.function = build_fused_function(keras_models, jit_compile=jit_compile)
+
+    def predict(self, batch):
+        return self.function(np.asarray(batch, dtype=np.float32)).numpy()
+
+
+def load_fused_pipeline(runtime, models, num_threads=None):
+    if runtime == "tflite":
+        if not os.path.exists(FUSED_PIPELINE_FILE):
+            raise FileNotFoundError(
+                f"{FUSED_PIPELINE_FILE} not found, run export_models.py --fused to create it"
+            )
+        return TFLiteTimestepModel(FUSED_PIPELINE_FILE, num_threads=num_threads)
+    return FusedKerasPipeline({name: model.model for name, model in models.items()})
@@ -16,6 +16,7 @@ router.get("/my/fire/prediction", verifyToken, prepocessorController.fetchAll);
 router.post("/predict/cam/result", upload, verifyToken,prepocessorController.handleFirePrediction);
 router.post("/process-data", prepocessorController.handleFireSize);
 router.get("/fire-data", prepocessorController.getAllFireData);
+router.post("/fire-data/rescore", verifyToken, prepocessorController.rescoreAllFireData);
 router.get("/fire-data-byId", authMiddleware, prepocessorController.getFireDataById);
 
 
@@ -61,6 +61,29 @@ exports.getFireDataById = async (id) => {
   }
 }
 
+exports.rescoreAllFireData = async () => {
+  try {
+    const records = await FireData.find();
+    if (records.length === 0) {
+      return {};
+    }
+    const sequences = {};
+    for (const record of records) {
+      sequences[record.location] = record.data;
+    }
+    const flaskResponse = await axios.post("http://localhost:5002/predict_batch", {
+      sequences,
+    });
+    if (flaskResponse.data.status !== "success") {
+      throw new Error(flaskResponse.data.message || "Batch prediction failed");
+    }
+    return flaskResponse.data.predictions;
+  } catch (error) {
+    console.error("error::", error.message);
+    throw new Error("Unable to rescore fire data: " + error.message);
+  }
+};
+
 exports.savePredictionData = async (userId, fireData, fireDataId) => {
   try {
     const response = await FireData.findById(fireDataId);
@@ -104,21 +127,26 @@ const uploadImageToS3 = async (file) => {
 };
 
 exports.predictImage = async (file, userId) => {
-  
-  const imageUrl = await uploadImageToS3(file);
-  
   try {
-    const response = await axios.post("http://localhost:5003/predict", {
-      imageUrl,
-      colormap: "PLASMA",
-    });
-    const imageBuffer = await axios({
-      url: response.data.camImageUrl,
-      responseType: "arraybuffer",
-    });
-  
+    if (!file) {
+      const error = new Error("Image upload required");
+      error.statusCode = 400;
+      throw error;
+    }
+
+    // Send the bytes straight to the model server and get the CAM back inline,
+    // while the original is stored in S3 in parallel.
+    const [imageUrl, response] = await Promise.all([
+      uploadImageToS3(file),
+      axios.post("http://localhost:5003/predict", file.buffer, {
+        params: { colormap: "PLASMA", camFormat: "base64" },
+        headers: { "Content-Type": "application/octet-stream" },
+        maxBodyLength: Infinity,
+      }),
+    ]);
+
     const resultUpload = await uploadImageToS3({
-      buffer: imageBuffer.data,
+      buffer: Buffer.from(response.data.camImageBase64, "base64"),
       originalname: "camImage.jpg", 
       mimetype: "image/jpeg", 
     });
@@ -135,8 +163,8 @@ exports.predictImage = async (file, userId) => {
   
     return savedPrediction;
   } catch (err) {
-    const message = err.response?.data?.message || "Prediction failed.";
-    const status = err.response?.status || 500;
+    const message = err.response?.data?.message || err.message || "Prediction failed.";
+    const status = err.response?.status || err.statusCode || 500;
     const error = new Error(message);
     error.statusCode = status;
     throw error;